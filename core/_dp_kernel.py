@@ -0,0 +1,44 @@
+"""
+Numba-compiled relaxation kernel for the refueling DAG.
+
+Optional: importing this module raises ``ImportError`` when numba is not
+installed, and ``core.logic`` falls back to the NumPy implementation.
+"""
+
+import math
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def relax(
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    range_mi: float,
+    mpg: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run the DAG DP over ``float64`` arrays sorted by mileage.
+
+    Returns ``(min_cost, parent)``; ``parent[j] == -1`` marks no predecessor.
+    """
+    n = mileages.shape[0]
+    min_cost = np.full(n, math.inf)
+    parent = np.full(n, -1, dtype=np.int64)
+    min_cost[0] = 0.0
+
+    for i in range(n):
+        if min_cost[i] == math.inf:
+            continue
+        rate = prices[i] / mpg
+        for j in range(i + 1, n):
+            dist_ij = mileages[j] - mileages[i]
+            if dist_ij > range_mi:
+                break
+            new_cost = min_cost[i] + dist_ij * rate
+            if new_cost < min_cost[j]:
+                min_cost[j] = new_cost
+                parent[j] = i
+
+    return min_cost, parent
@@ -0,0 +1,40 @@
+"""
+Numba-compiled cluster sweep for the station pre-filter.
+
+Optional: importing this module raises ``ImportError`` when numba is not
+installed, and ``core.services`` falls back to the NumPy implementation.
+"""
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def cluster_cheapest(
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    segment_miles: float,
+    out: np.ndarray,
+) -> int:
+    """
+    Sweep ``float64`` arrays sorted by mileage into clusters spanning at most
+    ``segment_miles`` and write the index of each cluster's cheapest station
+    (ties -> earliest) into ``out``.
+
+    Returns the number of indices written.
+    """
+    n = mileages.shape[0]
+    count = 0
+    i = 0
+    while i < n:
+        limit = mileages[i] + segment_miles
+        best = i
+        j = i + 1
+        while j < n and mileages[j] <= limit:
+            if prices[j] < prices[best]:
+                best = j
+            j += 1
+        out[count] = best
+        count += 1
+        i = j
+    return count
@@ -9,16 +9,20 @@ VEHICLE_MPG: int = 10
 # ---------------------------------------------------------------------------
 STATION_BUFFER_MI: int = 10
 DEGREES_PER_MILE: float = 1 / 69.0  # 1 deg lat ~ 69 mi
+STATIONS_CACHE_TTL: int = 3600  # 1 hour (price refresh cadence)
+STATIONS_CACHE_EPOCH_KEY: str = "stations:epoch"  # bumped when stations change
 
 # ---------------------------------------------------------------------------
-# Pre-filter (stations per segment)
+# Pre-filter (cheapest station per cluster)
 # ---------------------------------------------------------------------------
-PREFILTER_SEGMENT_MI: int = 50
+PREFILTER_SEGMENT_MI: int = 50  # max span of one cluster
+PREFILTER_NUMPY_MIN: int = 32  # below this, a plain loop beats NumPy setup cost
 
 # ---------------------------------------------------------------------------
 # Unit conversion
 # ---------------------------------------------------------------------------
 METERS_TO_MILES: float = 0.000621371
+EARTH_RADIUS_MI: float = 3958.8  # mean radius, for haversine
 
 # ---------------------------------------------------------------------------
 # External APIs
@@ -27,3 +31,11 @@ ORS_ROUTE_URL: str = (
     "https://api.openrouteservice.org/v2/directions/driving-car/geojson"
 )
 ROUTE_CACHE_TTL: int = 3600  # 1 hour
+ORS_TIMEOUT: int = 30  # seconds, per request attempt
+ORS_POOL_SIZE: int = 32  # keep-alive connections shared by worker threads
+ORS_RETRY_TOTAL: int = 3
+ORS_RETRY_BACKOFF: float = 0.3  # 0.3s, 0.6s, 1.2s between attempts
+ORS_RETRY_STATUSES: tuple[int, ...] = (502, 503, 504)
+GEOCODE_CACHE_TTL: int = 86400  # 1 day
+GEOCODE_NOT_FOUND: str = "NOTFOUND"  # cached marker for addresses with no match
+GEOCODE_LRU_SIZE: int = 50_000  # in-process memo of matches in front of the shared cache
@@ -4,16 +4,30 @@ Refueling DAG — shortest path on a DAG for minimum fuel cost.
 Nodes: Start (mile 0), stations (mileage = fraction x total_miles), Finish.
 Edges: A -> B iff mileage(B) - mileage(A) <= range_mi.
 Weight: (dist / mpg) x price(A).
+
+The relaxation cannot be reduced to a sliding-window minimum (monotonic
+deque): ``min_cost[j] = min_i(min_cost[i] + (m[j] - m[i]) * p[i] / mpg)``
+has a term ``m[j] * p[i]`` coupling predecessor and successor, so the best
+predecessor depends on ``j`` and not only on a per-``i`` key.
 """
 
 from __future__ import annotations
 
 import math
+from collections.abc import Sequence
+from dataclasses import dataclass
 from decimal import Decimal
 from typing import TypedDict
 
+import numpy as np
+
 from core.constants import VEHICLE_MPG, VEHICLE_RANGE_MI
 
+try:
+    from core._dp_kernel import relax as _relax_jit
+except ImportError:  # numba is optional
+    _relax_jit = None
+
 
 class RouteNode(TypedDict, total=False):
     """Type for DAG nodes (Start, stations, and Finish)."""
@@ -30,6 +44,75 @@ class RouteNode(TypedDict, total=False):
     cost: float
 
 
+@dataclass(slots=True)
+class NodeArrays(Sequence):
+    """
+    DAG nodes as parallel arrays (Structure of Arrays).
+
+    Indexing builds a ``RouteNode`` on demand, so the optimizer only
+    materializes dicts for the stops on the cheapest path.
+    """
+
+    mileage: np.ndarray
+    price: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    meta: list[tuple[str, str, int | None]]  # (name, address, station_id)
+
+    def __len__(self) -> int:
+        return len(self.mileage)
+
+    def __getitem__(self, i: int) -> RouteNode:
+        name, address, station_id = self.meta[i]
+        return RouteNode(
+            mileage=float(self.mileage[i]),
+            price=float(self.price[i]),
+            lat=float(self.lat[i]),
+            lon=float(self.lon[i]),
+            name=name,
+            address=address,
+            station_id=station_id,
+        )
+
+
+def _relax_numpy(
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    range_mi: float,
+    mpg: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run the DAG DP over ``float64`` arrays sorted by mileage.
+
+    Returns ``(min_cost, parent)``; ``parent[j] == -1`` marks no predecessor.
+    """
+    n: int = len(mileages)
+    min_cost = np.full(n, math.inf, dtype=np.float64)
+    parent = np.full(n, -1, dtype=np.int64)
+    min_cost[0] = 0.0
+
+    # Last reachable index for each node (nodes already sorted by mileage)
+    upper = np.searchsorted(mileages, mileages + range_mi, side="right")
+
+    # Topological order = index order; relax all out-edges of i at once
+    for i in range(n):
+        if min_cost[i] == math.inf:
+            continue
+        j_hi = int(upper[i])
+        if j_hi <= i + 1:
+            continue
+        cand = min_cost[i] + (mileages[i + 1 : j_hi] - mileages[i]) * (prices[i] / mpg)
+        window = min_cost[i + 1 : j_hi]
+        mask = cand < window
+        min_cost[i + 1 : j_hi] = np.where(mask, cand, window)
+        parent[i + 1 : j_hi][mask] = i
+
+    return min_cost, parent
+
+
+_relax = _relax_jit if _relax_jit is not None else _relax_numpy
+
+
 def optimize_refuel_dag(
     nodes: list[RouteNode],
     total_miles: float,
@@ -54,60 +137,67 @@ def optimize_refuel_dag(
         return [], Decimal("0"), Decimal("0")
 
     n: int = len(nodes)
-    INF: float = math.inf
+    mileages = np.fromiter(
+        (node.get("mileage", 0) for node in nodes), dtype=np.float64, count=n
+    )
+    prices = np.fromiter(
+        (node.get("price", 0) for node in nodes), dtype=np.float64, count=n
+    )
+    return optimize_refuel_arrays(mileages, prices, nodes, range_mi=range_mi, mpg=mpg)
+
+
+def optimize_refuel_arrays(
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    nodes: Sequence[RouteNode],
+    range_mi: int = VEHICLE_RANGE_MI,
+    mpg: int = VEHICLE_MPG,
+) -> tuple[list[RouteNode], Decimal | None, Decimal]:
+    """
+    Same as ``optimize_refuel_dag``, on a Structure-of-Arrays input.
 
-    mileages: list[float] = [float(nodes[i].get("mileage", 0)) for i in range(n)]
-    prices: list[float] = [float(nodes[i].get("price", 0)) for i in range(n)]
-    prices[0] = 0.0  # Start never charges
+    ``mileages`` / ``prices`` are ``float64`` arrays parallel to ``nodes``
+    (sorted by mileage, Start first, Finish last); ``nodes`` (a list or a
+    ``NodeArrays``) is only indexed to build the returned stops.
+    ``prices[0]`` is ignored (Start never charges).
+    """
+    n: int = len(mileages)
+    if n < 2:
+        return [], Decimal("0"), Decimal("0")
 
-    min_cost: list[float] = [INF] * n
-    parent: list[int | None] = [None] * n
-    min_cost[0] = 0.0
+    if prices[0] != 0.0:
+        prices = prices.copy()
+        prices[0] = 0.0  # Start never charges
 
-    # Topological order = index order (nodes already sorted by mileage)
-    for i in range(n):
-        if min_cost[i] == INF:
-            continue
-        for j in range(i + 1, n):
-            dist_ij: float = mileages[j] - mileages[i]
-            if dist_ij > range_mi:
-                break
-            gallons_ij: float = dist_ij / mpg
-            cost_ij: float = gallons_ij * prices[i]
-            new_cost: float = min_cost[i] + cost_ij
-            if new_cost < min_cost[j]:
-                min_cost[j] = new_cost
-                parent[j] = i
+    min_cost, parent = _relax(mileages, prices, float(range_mi), float(mpg))
 
     # Reconstruct path Finish -> Start
     path_indices: list[int] = []
-    cur: int | None = n - 1
-    while cur is not None:
+    cur: int = n - 1
+    while cur != -1:
         path_indices.append(cur)
-        cur = parent[cur]
+        cur = int(parent[cur])
     path_indices.reverse()
 
     if path_indices[0] != 0:
         return [], None, Decimal("0")
 
-    # Build stops with gallons/cost
+    # Per-leg gallons/cost over consecutive path pairs (leg k starts at path[k])
+    path = np.asarray(path_indices, dtype=np.int64)
+    gallons = np.diff(mileages[path]) / mpg
+    costs = gallons * prices[path[:-1]]
+
+    # Stops = path without Start/Finish; each buys fuel for the leg it starts
     path_stops: list[RouteNode] = []
-    total_cost = Decimal("0")
-    total_gallons = Decimal("0")
-
-    for idx in range(len(path_indices) - 1):
-        i: int = path_indices[idx]
-        j: int = path_indices[idx + 1]
-        dist_ij = mileages[j] - mileages[i]
-        gallons_ij_d = Decimal(str(dist_ij)) / Decimal(str(mpg))
-        cost_ij_d = gallons_ij_d * Decimal(str(prices[i]))
-        total_gallons += gallons_ij_d
-        total_cost += cost_ij_d
-
-        if i > 0:  # exclude Start
-            stop = RouteNode(**nodes[i])
-            stop["gallons"] = float(gallons_ij_d)
-            stop["cost"] = float(cost_ij_d)
-            path_stops.append(stop)
-
-    return path_stops, total_cost, total_gallons
+    for i, gallons_i, cost_i in zip(
+        path_indices[1:-1], gallons[1:].tolist(), costs[1:].tolist()
+    ):
+        stop = RouteNode(**nodes[i])
+        stop["gallons"] = gallons_i
+        stop["cost"] = cost_i
+        path_stops.append(stop)
+
+    # Float sums, one Decimal conversion at the end
+    total_cost = float(costs.sum())
+    total_gallons = float(gallons.sum())
+    return path_stops, Decimal(f"{total_cost:.6f}"), Decimal(f"{total_gallons:.6f}")
@@ -3,34 +3,38 @@ import_stations: Import fuel stations from CSV with parallel geocoding.
 
 Flow:
   1. Google Geocoding (parallel via asyncio + aiohttp)
-  2. Nominatim (sequential — rate limited)
-  3. ORS POI (sequential — rate limited)
+  2. Nominatim (concurrent — token-bucket rate limited)
+  3. ORS POI (near the Nominatim city result)
   4. City fallback
 """
 import asyncio
+import csv
+import io
 import os
 import re
-import time
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache, partial
+from typing import Awaitable, Callable, Optional
 from urllib.parse import quote_plus
 
 import aiohttp
 import openrouteservice
-import pandas as pd
+from aiolimiter import AsyncLimiter
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.gis.geos import Point
 from django.core.management.base import BaseCommand
-from geopy.exc import GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
-from geopy.geocoders import GoogleV3, Nominatim
+from django.db import connection, transaction
+from django.utils import timezone
+from geopy.geocoders import GoogleV3
 
 from core.models import FuelStation
+from core.services import station_cache_invalidate
 
 # ---------------------------------------------------------------------------
 # Dataclass
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class StationRow:
     """A parsed CSV row ready for geocoding."""
     opis_id: int
@@ -42,7 +46,7 @@ class StationRow:
     query_addr: str  # cleaned address for geocode
 
     # Geocoding result (populated later)
-    point: Optional[Point] = field(default=None, repr=False)
+    coords: Optional[tuple[float, float]] = field(default=None, repr=False)  # (lon, lat)
     method: str = "N/A"
 
 
@@ -50,17 +54,32 @@ class StationRow:
 # Pure functions
 # ---------------------------------------------------------------------------
 
+# Pass 1: drop highway markers and turn "&" / "/" into " and "
+_RE_EXIT_OR_AMP = re.compile(
+    r"(?P<exit>(?:EXIT|MM|Ex|AT\s+MILE)\s*[\w\d\-\s]+)|[&/]", re.IGNORECASE
+)
+# Pass 2: ", and" -> " and"
+_RE_AND_COMMA = re.compile(r",\s*and", re.IGNORECASE)
+# Pass 3: collapse ", ," to "," and whitespace runs to " "
+_RE_COMMA_OR_WHITESPACE = re.compile(r"(?P<comma>,\s*,)|\s+")
+
+
+def _exit_or_amp(match: re.Match) -> str:
+    return "" if match.group("exit") else " and "
+
+
+def _comma_or_whitespace(match: re.Match) -> str:
+    return "," if match.group("comma") else " "
+
+
+@lru_cache(maxsize=4096)
 def clean_highway_address(raw: str) -> str:
     """Remove EXIT, MM, AT MILE and normalize punctuation."""
     if not raw:
         return ""
-    cleaned = re.sub(
-        r"(?:EXIT|MM|Ex|AT\s+MILE)\s*[\w\d\-\s]+", "", raw, flags=re.IGNORECASE
-    )
-    cleaned = cleaned.replace("&", " and ").replace("/", " and ")
-    cleaned = re.sub(r",\s*and", " and", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    cleaned = re.sub(r",\s*,", ",", cleaned)
+    cleaned = _RE_EXIT_OR_AMP.sub(_exit_or_amp, raw)
+    cleaned = _RE_AND_COMMA.sub(" and", cleaned)
+    cleaned = _RE_COMMA_OR_WHITESPACE.sub(_comma_or_whitespace, cleaned)
     return cleaned.strip(" ,")
 
 
@@ -85,39 +104,91 @@ async def _geocode_one_google(
                 data = await resp.json()
                 if data.get("status") == "OK" and data.get("results"):
                     loc = data["results"][0]["geometry"]["location"]
-                    row.point = Point(loc["lng"], loc["lat"])
+                    row.coords = (loc["lng"], loc["lat"])
                     row.method = "ADDRESS (Google)"
         except Exception:
             pass  # fallback will be handled later
     return row
 
 
-async def geocode_google_batch(
+async def process_chunks(
     rows: list[StationRow],
+    chunk_size: int,
     api_key: str,
-    concurrency: int = 10,
-) -> list[StationRow]:
-    """Geocode a list of StationRows in parallel using Google."""
+    concurrency: int,
+    fallback: Callable[[StationRow, aiohttp.ClientSession], Awaitable[StationRow]],
+    on_chunk: Callable[[list[StationRow]], Awaitable[None]],
+) -> None:
+    """
+    Geocode ``rows`` chunk by chunk over one shared aiohttp session
+    (keep-alive pool reused across chunks), then hand each chunk to ``on_chunk``.
+
+    Google calls are consumed with ``as_completed``: each miss is sent to the
+    rate-limited ``fallback`` as soon as it comes back, so the fallback runs
+    while the rest of the chunk is still being geocoded by Google.
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
     semaphore = asyncio.Semaphore(concurrency)
-    async with aiohttp.ClientSession() as session:
-        tasks = [
-            _geocode_one_google(row, api_key, session, semaphore)
-            for row in rows
-        ]
-        return await asyncio.gather(*tasks)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            if api_key:
+                fallback_tasks: list[asyncio.Task] = []
+                google_tasks = [
+                    _geocode_one_google(row, api_key, session, semaphore)
+                    for row in chunk
+                ]
+                for fut in asyncio.as_completed(google_tasks):
+                    row = await fut
+                    if row.coords is None:
+                        fallback_tasks.append(asyncio.create_task(fallback(row, session)))
+                await asyncio.gather(*fallback_tasks)
+            else:
+                await asyncio.gather(*(fallback(row, session) for row in chunk))
+            await on_chunk(chunk)
 
 
 # ---------------------------------------------------------------------------
-# Sequential fallback (Nominatim / ORS / City)
+# Rate-limited fallback (Nominatim / ORS / City)
 # ---------------------------------------------------------------------------
 
-def _geocode_nominatim(geolocator, query: str):
-    """Nominatim with retry (rate limited: 1 req/s)."""
-    for _ in range(2):
+NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_USER_AGENT = "fuel_optimizer_v2"
+NOMINATIM_ATTEMPTS = 2
+
+
+async def _geocode_nominatim_async(
+    query: str,
+    session: aiohttp.ClientSession,
+    limiter: AsyncLimiter,
+    search_url: str,
+) -> Optional[tuple[float, float]]:
+    """
+    Resolve ``query`` to ``(lon, lat)`` via Nominatim's ``/search`` endpoint.
+    Every attempt, retries included, takes its own ``limiter`` token; only
+    429/5xx and transport errors are retried.
+    """
+    params = {"q": query, "format": "jsonv2", "limit": 1}
+    headers = {"User-Agent": NOMINATIM_USER_AGENT}
+    timeout = aiohttp.ClientTimeout(total=10)
+    for _ in range(NOMINATIM_ATTEMPTS):
+        async with limiter:
+            try:
+                async with session.get(
+                    search_url, params=params, headers=headers, timeout=timeout,
+                ) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json()
+            except aiohttp.ClientResponseError as e:
+                if e.status != 429 and e.status < 500:
+                    return None
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                continue
         try:
-            return geolocator.geocode(query, timeout=5, exactly_one=True)
-        except (GeocoderTimedOut, GeocoderServiceError, GeocoderUnavailable):
-            time.sleep(2)
+            return (float(data[0]["lon"]), float(data[0]["lat"])) if data else None
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
     return None
 
 
@@ -132,42 +203,114 @@ def _search_ors_poi(client, name: str, focus_coords: tuple):
     return None
 
 
-def fallback_sequential(
-    rows: list[StationRow],
-    geolocator,
+async def geocode_fallback_one(
+    row: StationRow,
+    session: aiohttp.ClientSession,
+    limiter: AsyncLimiter,
+    search_url: str,
     ors_client,
-    verbose: bool,
     log_fn=None,
-) -> list[StationRow]:
-    """Process rows that failed Google geocoding, one by one (rate limited)."""
-    for row in rows:
-        query_addr = row.query_addr
-        # 1) Nominatim (address)
-        loc = _geocode_nominatim(geolocator, query_addr)
-        if loc:
-            row.point = Point(loc.longitude, loc.latitude)
-            row.method = "ADDRESS (Nominatim)"
-            time.sleep(1.2)
-            continue
-
-        # 2) Nominatim (city) + ORS POI / city fallback
-        query_city = f"{row.city}, {row.state}, USA"
-        city_loc = _geocode_nominatim(geolocator, query_city)
-        if city_loc:
-            city_coords = (city_loc.longitude, city_loc.latitude)
-            poi = _search_ors_poi(ors_client, row.name, city_coords) if ors_client else None
-            if poi:
-                row.point = Point(poi[0], poi[1])
-                row.method = "NAME_POI (ORS)"
-            else:
-                row.point = Point(city_coords[0], city_coords[1])
-                row.method = "CITY_FALLBACK"
+    city_cache: Optional[dict[str, asyncio.Task]] = None,
+) -> StationRow:
+    """
+    Geocode one row that failed Google: address -> ORS POI near city -> city.
+    Throughput is bounded by ``limiter`` (1 req/s for public Nominatim), so
+    city lookups are shared through ``city_cache`` (one task per city, also
+    awaited by rows that ask while it is still in flight).
+    """
+    # 1) Nominatim (address)
+    coords = await _geocode_nominatim_async(row.query_addr, session, limiter, search_url)
+    if coords:
+        row.coords = coords
+        row.method = "ADDRESS (Nominatim)"
+        return row
+
+    # 2) Nominatim (city) + ORS POI / city fallback
+    query_city = f"{row.city}, {row.state}, USA"
+    if city_cache is None:
+        city_cache = {}
+    city_task = city_cache.get(query_city)
+    if city_task is None:
+        city_task = city_cache[query_city] = asyncio.ensure_future(
+            _geocode_nominatim_async(query_city, session, limiter, search_url)
+        )
+    city_coords = await city_task
+    if city_coords:
+        poi = (
+            await asyncio.to_thread(_search_ors_poi, ors_client, row.name, city_coords)
+            if ors_client else None
+        )
+        if poi:
+            row.coords = (poi[0], poi[1])
+            row.method = "NAME_POI (ORS)"
         else:
-            row.method = "FAILED"
-            if log_fn:
-                log_fn(f"City not found: {row.city}, {row.state}")
-        time.sleep(1.2)
-    return rows
+            row.coords = city_coords
+            row.method = "CITY_FALLBACK"
+    else:
+        row.method = "FAILED"
+        if log_fn:
+            log_fn(f"City not found: {row.city}, {row.state}")
+    return row
+
+
+# ---------------------------------------------------------------------------
+# Bulk insert (PostgreSQL COPY)
+# ---------------------------------------------------------------------------
+
+COPY_COLUMNS = (
+    "opis_id", "name", "address", "city", "state",
+    "retail_price", "location", "created_at", "updated_at",
+)
+
+
+def _copy_text(value: str) -> str:
+    """Escape a value for COPY's text format."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", " ")
+        .replace("\n", " ")
+        .replace("\r", " ")
+    )
+
+
+def copy_stations(rows: list[StationRow]) -> None:
+    """
+    Insert geocoded rows: ``COPY ... FROM STDIN`` (EWKT location) into a temp
+    staging table, then one ``INSERT ... ON CONFLICT (opis_id) DO NOTHING``
+    so re-runs and concurrent imports never fail on duplicates.
+
+    Must run inside a transaction (the staging table is dropped on commit).
+    """
+    now = timezone.now().isoformat()
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join((
+            str(row.opis_id),
+            _copy_text(row.name),
+            _copy_text(row.raw_addr),
+            _copy_text(row.city),
+            _copy_text(row.state),
+            f"{row.price:.3f}",
+            f"SRID=4326;POINT({row.coords[0]} {row.coords[1]})",
+            now,
+            now,
+        )))
+        buf.write("\n")
+    buf.seek(0)
+
+    table = FuelStation._meta.db_table
+    columns = ", ".join(COPY_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE import_stations_stage ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY import_stations_stage ({columns}) FROM STDIN", buf)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {columns} FROM import_stations_stage "
+            f"ON CONFLICT (opis_id) DO NOTHING"
+        )
 
 
 # ---------------------------------------------------------------------------
@@ -183,13 +326,21 @@ class Command(BaseCommand):
             help="Show errors and extra details.",
         )
         parser.add_argument(
-            "--batch-size", type=int, default=200, metavar="N",
-            help="Stations per bulk_create (default: 200).",
+            "--batch-size", type=int, default=500, metavar="N",
+            help="Stations per COPY chunk (default: 500).",
         )
         parser.add_argument(
             "--concurrency", type=int, default=10, metavar="N",
             help="Concurrent Google calls (default: 10).",
         )
+        parser.add_argument(
+            "--nominatim-url", default=NOMINATIM_SEARCH_URL, metavar="URL",
+            help="Nominatim /search endpoint (default: public OSM instance).",
+        )
+        parser.add_argument(
+            "--nominatim-qps", type=float, default=1.0, metavar="N",
+            help="Max Nominatim requests per second (default: 1, public usage policy).",
+        )
 
     # ------------------------------------------------------------------
     # handle
@@ -198,6 +349,8 @@ class Command(BaseCommand):
         verbose = options["verbose"]
         batch_size = max(1, options["batch_size"])
         concurrency = max(1, min(options["concurrency"], 50))
+        nominatim_url = options["nominatim_url"]
+        nominatim_qps = max(0.1, options["nominatim_qps"])
 
         file_path = os.path.join(settings.BASE_DIR, "fuel-prices-for-be-assessment.csv")
         google_key = getattr(settings, "GOOGLE_GEOCODE_API_KEY", "") or ""
@@ -213,8 +366,6 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.WARNING("GOOGLE_GEOCODE_API_KEY not set."))
 
-        geolocator = Nominatim(user_agent="fuel_optimizer_v2", timeout=10)
-
         ors_client = None
         if ors_key:
             try:
@@ -223,36 +374,37 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"ORS unavailable: {e}"))
 
-        # --- Read CSV + filter ---
+        # --- Read CSV (streamed) + filter ---
         try:
-            df = pd.read_csv(file_path)
+            csv_file = open(file_path, newline="", encoding="utf-8")
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f"File not found: {file_path}"))
             return
 
         rows: list[StationRow] = []
-        for _, csv_row in df.iterrows():
-            opis_id = int(csv_row["OPIS Truckstop ID"])
-            if opis_id in existing_ids:
-                continue
-            existing_ids.add(opis_id)  # mark to avoid CSV duplicates
-            raw_addr = str(csv_row["Address"])
-            try:
-                price = float(csv_row["Retail Price"])
-            except (ValueError, TypeError):
-                price = 0.0
-            clean = clean_highway_address(raw_addr)
-            city = str(csv_row["City"])
-            state = str(csv_row["State"])
-            rows.append(StationRow(
-                opis_id=opis_id,
-                name=str(csv_row["Truckstop Name"]),
-                raw_addr=raw_addr,
-                city=city,
-                state=state,
-                price=price,
-                query_addr=f"{clean}, {city}, {state}, USA",
-            ))
+        with csv_file:
+            for csv_row in csv.DictReader(csv_file):
+                opis_id = int(csv_row["OPIS Truckstop ID"])
+                if opis_id in existing_ids:
+                    continue
+                existing_ids.add(opis_id)  # mark to avoid CSV duplicates
+                raw_addr = csv_row["Address"]
+                try:
+                    price = float(csv_row["Retail Price"])
+                except (ValueError, TypeError):
+                    price = 0.0
+                clean = clean_highway_address(raw_addr)
+                city = csv_row["City"]
+                state = csv_row["State"]
+                rows.append(StationRow(
+                    opis_id=opis_id,
+                    name=csv_row["Truckstop Name"],
+                    raw_addr=raw_addr,
+                    city=city,
+                    state=state,
+                    price=price,
+                    query_addr=f"{clean}, {city}, {state}, USA",
+                ))
 
         total = len(rows)
         self.stdout.write(self.style.SUCCESS(
@@ -262,43 +414,18 @@ class Command(BaseCommand):
         # --- Counters ---
         counts = {"Google": 0, "Nominatim": 0, "ORS": 0, "City": 0, "Failed": 0}
         saved = 0
-        batch: list[FuelStation] = []
-
-        # --- Process in chunks ---
-        chunk_size = max(batch_size, concurrency * 5)
-        for start in range(0, total, chunk_size):
-            chunk = rows[start : start + chunk_size]
 
-            # Phase 1: Google parallel
-            if google_key:
-                chunk = asyncio.run(geocode_google_batch(chunk, google_key, concurrency))
+        def finish_chunk(chunk: list[StationRow]) -> None:
+            nonlocal saved
 
-            # Separate successes and failures
-            google_ok = [r for r in chunk if r.point is not None]
-            google_fail = [r for r in chunk if r.point is None]
-
-            # Phase 2: Sequential fallback
-            if google_fail:
-                fallback_sequential(
-                    google_fail, geolocator, ors_client, verbose,
-                    log_fn=lambda msg: self.stdout.write(self.style.ERROR(msg)),
-                )
-
-            # Phase 3: Save + log
+            # Phase 3: Log + COPY the whole chunk in one transaction
+            to_save: list[StationRow] = []
             for row in chunk:
-                if row.point is None:
+                if row.coords is None:
                     counts["Failed"] += 1
                     continue
 
-                batch.append(FuelStation(
-                    opis_id=row.opis_id,
-                    name=row.name,
-                    address=row.raw_addr,
-                    city=row.city,
-                    state=row.state,
-                    retail_price=row.price,
-                    location=row.point,
-                ))
+                to_save.append(row)
                 saved += 1
 
                 # Counters
@@ -314,14 +441,28 @@ class Command(BaseCommand):
                 # Log
                 self._log_row(saved, total, row)
 
-                # Bulk create when batch is full
-                if len(batch) >= batch_size:
-                    FuelStation.objects.bulk_create(batch)
-                    batch.clear()
+            if to_save:
+                with transaction.atomic():
+                    copy_stations(to_save)
 
-        # Remaining
-        if batch:
-            FuelStation.objects.bulk_create(batch)
+        # --- Process in chunks ---
+        # Phase 1 (Google) and Phase 2 (rate-limited fallback) run on the
+        # event loop; DB writes run in Django's sync thread between chunks.
+        limiter = AsyncLimiter(1, 1 / nominatim_qps)  # evenly spaced, no bursts
+        fallback = partial(
+            geocode_fallback_one,
+            limiter=limiter,
+            search_url=nominatim_url,
+            ors_client=ors_client,
+            log_fn=lambda msg: self.stdout.write(self.style.ERROR(msg)),
+            city_cache={},
+        )
+        chunk_size = max(batch_size, concurrency * 5)
+        asyncio.run(process_chunks(
+            rows, chunk_size, google_key, concurrency, fallback, sync_to_async(finish_chunk),
+        ))
+        if saved:
+            station_cache_invalidate()  # COPY bypasses post_save signals
 
         # --- Summary ---
         self.stdout.write("")
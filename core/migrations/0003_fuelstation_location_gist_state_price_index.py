@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-15 12:00
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_fuelstation_options_fuelstation_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fuelstation',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(spatial_index=False, srid=4326),
+        ),
+        migrations.AddIndex(
+            model_name='fuelstation',
+            index=django.contrib.postgres.indexes.GistIndex(buffering=True, fields=['location'], name='fuelstation_loc_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelstation',
+            index=models.Index(fields=['state', 'retail_price'], name='fuelstation_state_price_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
 from django.utils import timezone
 
 
@@ -23,10 +24,23 @@ class FuelStation(BaseModel):
         decimal_places=3,
         db_index=True,
     )
-    location = models.PointField(srid=4326, spatial_index=True)
+    # GiST index declared in Meta.indexes (buffered build)
+    location = models.PointField(srid=4326, spatial_index=False)
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            GistIndex(
+                fields=["location"],
+                name="fuelstation_loc_gist",
+                buffering=True,
+            ),
+            # Admin: list_filter on state + sort by price
+            models.Index(
+                fields=["state", "retail_price"],
+                name="fuelstation_state_price_idx",
+            ),
+        ]
         verbose_name = "Fuel Station"
         verbose_name_plural = "Fuel Stations"
 
@@ -0,0 +1,34 @@
+"""
+orjson-backed JSON renderer for the route endpoint.
+
+``route_plan`` already returns JSON-native types, so the view hands its
+result straight to this renderer instead of re-walking it through an
+``OutputSerializer``.
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    """Fallback for the few types orjson doesn't encode natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class OrjsonRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
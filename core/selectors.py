@@ -5,24 +5,91 @@ Following the HackSoft Django Styleguide: selectors never mutate data,
 they only query and return QuerySets or derived values.
 """
 
+import hashlib
+from typing import Any
+
 from django.contrib.gis.db.models.functions import LineLocatePoint
 from django.contrib.gis.geos import LineString
-from django.db.models import QuerySet
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, FloatField, Func, QuerySet, Value
+from django.db.models.functions import Cast
 
-from core.constants import DEGREES_PER_MILE, STATION_BUFFER_MI
+from core.constants import (
+    DEGREES_PER_MILE,
+    STATION_BUFFER_MI,
+    STATIONS_CACHE_EPOCH_KEY,
+    STATIONS_CACHE_TTL,
+)
 from core.models import FuelStation
 
+# Column order of the ``station_rows_on_route`` tuples
+STATION_ROW_FIELDS: tuple[str, ...] = (
+    "mileage",
+    "price",
+    "lat",
+    "lon",
+    "name",
+    "address",
+    "opis_id",
+)
+
 
-def station_list_on_route(*, route_geom: LineString) -> QuerySet[FuelStation]:
+def station_list_on_route(
+    *,
+    route_geom: LineString,
+    route_length_miles: float,
+) -> QuerySet:
     """
     Return stations within a ~STATION_BUFFER_MI mile buffer of the route,
-    annotated with ``fraction`` (0.0 -> 1.0) for their linear position on the route.
+    ordered by their linear position on it and annotated with ``mileage``
+    (``fraction`` 0.0 -> 1.0 times ``route_length_miles``), computed in the DB.
+
+    Rows are plain dicts (``.values()``): coordinates are unpacked in the DB
+    (``ST_X``/``ST_Y`` -> ``lon``/``lat``) and ``retail_price`` is cast to a
+    float ``price``, so no model, GEOS or ``Decimal`` object is built per
+    station.
     """
     buffer_degrees: float = STATION_BUFFER_MI * DEGREES_PER_MILE
     return (
         FuelStation.objects
         .filter(location__dwithin=(route_geom, buffer_degrees))
         .annotate(fraction=LineLocatePoint(route_geom, "location"))
-        .only("opis_id", "name", "address", "retail_price", "location")
         .order_by("fraction")
+        .values(
+            "opis_id",
+            "name",
+            "address",
+            price=Cast("retail_price", output_field=FloatField()),
+            mileage=ExpressionWrapper(
+                F("fraction") * Value(route_length_miles), output_field=FloatField()
+            ),
+            lon=Func("location", function="ST_X", output_field=FloatField()),
+            lat=Func("location", function="ST_Y", output_field=FloatField()),
+        )
     )
+
+
+def station_rows_on_route(
+    *,
+    route_geom: LineString,
+    route_length_miles: float,
+) -> list[tuple[Any, ...]]:
+    """
+    Cached ``station_list_on_route`` rows as plain tuples in
+    ``STATION_ROW_FIELDS`` order, keyed by the route geometry (WKB hash) and
+    length. Entries are dropped when the stations epoch is bumped (see
+    ``core.services.station_cache_invalidate``).
+    """
+    epoch = cache.get_or_set(STATIONS_CACHE_EPOCH_KEY, 0, None)
+    geom_hash = hashlib.blake2b(bytes(route_geom.wkb), digest_size=16).hexdigest()
+    key = f"stations:{epoch}:{geom_hash}:{int(route_length_miles)}"
+
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(
+            station_list_on_route(
+                route_geom=route_geom, route_length_miles=route_length_miles
+            ).values_list(*STATION_ROW_FIELDS)
+        )
+        cache.set(key, rows, STATIONS_CACHE_TTL)
+    return rows
@@ -11,27 +11,49 @@ from __future__ import annotations
 
 import hashlib
 import logging
-import re
-from collections import defaultdict
+import math
+import struct
+import threading
+from functools import lru_cache
 from typing import Any
 
+import numpy as np
+import orjson
 import requests
 from django.conf import settings
-from django.contrib.gis.geos import LineString
+from django.contrib.gis.geos import GEOSGeometry, LineString
 from django.core.cache import cache
 from geopy.exc import GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
 from geopy.geocoders import Nominatim
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from core.constants import (
+    EARTH_RADIUS_MI,
+    GEOCODE_CACHE_TTL,
+    GEOCODE_LRU_SIZE,
+    GEOCODE_NOT_FOUND,
     METERS_TO_MILES,
+    ORS_POOL_SIZE,
+    ORS_RETRY_BACKOFF,
+    ORS_RETRY_STATUSES,
+    ORS_RETRY_TOTAL,
     ORS_ROUTE_URL,
+    ORS_TIMEOUT,
+    PREFILTER_NUMPY_MIN,
     PREFILTER_SEGMENT_MI,
     ROUTE_CACHE_TTL,
+    STATIONS_CACHE_EPOCH_KEY,
     VEHICLE_MPG,
     VEHICLE_RANGE_MI,
 )
-from core.logic import RouteNode, optimize_refuel_dag
-from core.selectors import station_list_on_route
+from core.logic import NodeArrays, RouteNode, _relax_jit, optimize_refuel_arrays
+from core.selectors import station_rows_on_route
+
+try:
+    from core._prefilter_kernel import cluster_cheapest as _cluster_cheapest_jit
+except ImportError:  # numba is optional
+    _cluster_cheapest_jit = None
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +63,25 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 _geolocator: Nominatim | None = None
 _http_session: requests.Session | None = None
+_ors_headers: dict[str, str] | None = None
+
+
+class _RouteFlight:
+    """One in-progress ORS call; waiters share its result or its error."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: tuple[LineString, float] | None = None
+        self.error: BaseException | None = None
+
+
+# Single-flight: one ORS call per uncached route, concurrent callers wait on it
+_inflight: dict[str, _RouteFlight] = {}
+_inflight_lock = threading.Lock()
+# Upper bound on a leader's run: every attempt timing out, plus retry backoff
+_INFLIGHT_WAIT = ORS_TIMEOUT * (ORS_RETRY_TOTAL + 1) + 5
 
 
 def _get_geolocator() -> Nominatim:
@@ -51,49 +92,124 @@ def _get_geolocator() -> Nominatim:
 
 
 def _get_http_session() -> requests.Session:
-    """Persistent requests Session — reuses TCP/SSL connection with ORS."""
+    """
+    Persistent requests Session — reuses TCP/SSL connections with ORS.
+
+    The HTTPS adapter keeps up to ``ORS_POOL_SIZE`` connections alive so
+    concurrent worker threads don't queue on the default pool of 10, and
+    retries gateway errors with exponential backoff. The shared instance is
+    only used for ``post()``, which is safe across threads; don't mutate
+    its headers or cookies per request.
+    """
     global _http_session
     if _http_session is None:
-        _http_session = requests.Session()
+        retry = Retry(
+            total=ORS_RETRY_TOTAL,
+            backoff_factor=ORS_RETRY_BACKOFF,
+            status_forcelist=ORS_RETRY_STATUSES,
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=ORS_POOL_SIZE,
+            pool_maxsize=ORS_POOL_SIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        _http_session = session
     return _http_session
 
 
+def _get_ors_headers() -> dict[str, str]:
+    """ORS request headers, built once (settings are read lazily)."""
+    global _ors_headers
+    if _ors_headers is None:
+        _ors_headers = {
+            "Authorization": settings.ORS_API_KEY,
+            "Content-Type": "application/json",
+        }
+    return _ors_headers
+
+
 # ---------------------------------------------------------------------------
 # Geocoding
 # ---------------------------------------------------------------------------
 
-_COORD_RE = re.compile(r"^(-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)$")
+
+class _GeocoderUnavailable(Exception):
+    """Transient geocoder failure; raised so ``lru_cache`` does not keep it."""
+
+
+class _GeocodeNotFound(Exception):
+    """No match; raised so ``lru_cache`` leaves misses to the TTL'd shared cache."""
+
+
+@lru_cache(maxsize=GEOCODE_LRU_SIZE)
+def _geocode_address(normalized: str) -> tuple[float, float]:
+    """
+    Nominatim lookup for a normalized (lower-cased, whitespace-collapsed)
+    address, behind the shared cache. Only matches are memoized in-process.
+    """
+    cache_key = (
+        f"geocode:{hashlib.blake2s(normalized.encode(), digest_size=16).hexdigest()}"
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        if cached == GEOCODE_NOT_FOUND:
+            raise _GeocodeNotFound
+        return cached
+
+    try:
+        loc = _get_geolocator().geocode(normalized, exactly_one=True, timeout=10)
+    except (GeocoderTimedOut, GeocoderServiceError, GeocoderUnavailable) as exc:
+        raise _GeocoderUnavailable from exc
+
+    if loc is None:
+        cache.set(cache_key, GEOCODE_NOT_FOUND, GEOCODE_CACHE_TTL)
+        raise _GeocodeNotFound
+    result = (loc.latitude, loc.longitude)
+    cache.set(cache_key, result, GEOCODE_CACHE_TTL)
+    return result
+
+
+_NUMERIC_LEAD = frozenset("0123456789+-.")
 
 
 def geocode_to_coords(place: str) -> tuple[float, float] | None:
     """
     Resolve a place string to ``(lat, lon)`` or ``None``.
 
-    Accepts ``"lat,lon"`` or a textual address (Nominatim).
+    Accepts ``"lat,lon"`` or a textual address (Nominatim). Address lookups
+    (including "not found") are cached for ``GEOCODE_CACHE_TTL``; matches
+    are also memoized per process (``GEOCODE_LRU_SIZE`` addresses).
     """
-    if not place or not str(place).strip():
+    if not place:
+        return None
+    s = (place if isinstance(place, str) else str(place)).strip()
+    if not s:
         return None
 
-    s = str(place).strip()
-
-    match = _COORD_RE.match(s)
-    if match:
+    # "lat,lon": split + float() instead of a regex; anything else is geocoded.
+    # The first-char check keeps "City, ST" from paying for a float() ValueError.
+    if s[0] in _NUMERIC_LEAD and s.count(",") == 1:
+        lat_s, lon_s = s.split(",")
         try:
-            lat, lon = float(match.group(1)), float(match.group(2))
-            if -90 <= lat <= 90 and -180 <= lon <= 180:
-                return (lat, lon)
-            return None  # coordinates out of bounds
+            lat, lon = float(lat_s), float(lon_s)
         except ValueError:
             pass
+        else:
+            if math.isfinite(lat) and math.isfinite(lon):
+                if -90 <= lat <= 90 and -180 <= lon <= 180:
+                    return (lat, lon)
+                return None  # coordinates out of bounds
 
     try:
-        loc = _get_geolocator().geocode(s, exactly_one=True, timeout=10)
-        if loc:
-            return (loc.latitude, loc.longitude)
-    except (GeocoderTimedOut, GeocoderServiceError, GeocoderUnavailable):
-        pass
-
-    return None
+        return _geocode_address(" ".join(s.lower().split()))
+    except _GeocodeNotFound:
+        return None
+    except _GeocoderUnavailable:
+        return None  # transient: not cached
 
 
 # ---------------------------------------------------------------------------
@@ -105,12 +221,50 @@ def _route_cache_key(
     start_coords: tuple[float, float],
     end_coords: tuple[float, float],
 ) -> str:
-    """Generate a deterministic cache key for a coordinate pair."""
-    raw = (
-        f"{start_coords[0]:.6f},{start_coords[1]:.6f}"
-        f"|{end_coords[0]:.6f},{end_coords[1]:.6f}"
+    """
+    Generate a deterministic cache key for a coordinate pair: the four
+    coordinates rounded to ``settings.ROUTE_CACHE_PRECISION`` decimals,
+    packed as doubles and BLAKE2b-hashed.
+    """
+    ndigits: int = settings.ROUTE_CACHE_PRECISION
+    raw = struct.pack(
+        "<4d",
+        round(start_coords[0], ndigits),
+        round(start_coords[1], ndigits),
+        round(end_coords[0], ndigits),
+        round(end_coords[1], ndigits),
+    )
+    return f"ors_route:{hashlib.blake2b(raw, digest_size=16).hexdigest()}"
+
+
+def _linestring_from_coords(coords: list[list[float]]) -> LineString:
+    """
+    Build the route ``LineString`` from a single little-endian WKB buffer,
+    so GEOS parses all vertices in one call instead of one ctypes call each.
+    """
+    arr = np.asarray(coords, dtype="<f8")
+    header = struct.pack("<BII", 1, 2, len(arr))  # byte order, wkbLineString, npoints
+    return GEOSGeometry(memoryview(header + arr.tobytes()), srid=4326)
+
+
+def _linestring_coords(route_geom: LineString) -> np.ndarray:
+    """``(n, 2)`` coordinate array read straight from the geometry's WKB."""
+    wkb = route_geom.wkb
+    dtype = "<f8" if wkb[0] == 1 else ">f8"
+    return np.frombuffer(wkb, dtype=dtype, offset=9).reshape(-1, 2)
+
+
+def _haversine_miles(
+    start_coords: tuple[float, float], end_coords: tuple[float, float]
+) -> float:
+    """Great-circle distance in miles between two ``(lon, lat)`` points."""
+    lon1, lat1 = map(math.radians, start_coords)
+    lon2, lat2 = map(math.radians, end_coords)
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
     )
-    return f"ors_route:{hashlib.md5(raw.encode()).hexdigest()}"
+    return 2 * EARTH_RADIUS_MI * math.asin(math.sqrt(min(h, 1.0)))
 
 
 def get_route(
@@ -121,21 +275,68 @@ def get_route(
     Call ORS and return ``(route_geom, total_miles)``.
 
     ``start_coords`` / ``end_coords`` in ORS format ``(lon, lat)``.
-    Raises ``ValueError`` on API error or invalid response.
+    Trips under ``settings.ORS_MIN_DISTANCE_MILES`` are answered locally
+    with a straight segment. Concurrent misses for the same route share a
+    single ORS call and its outcome, errors included. Raises ``ValueError``
+    on API error or invalid response.
     """
+    direct_miles = _haversine_miles(start_coords, end_coords)
+    if direct_miles < settings.ORS_MIN_DISTANCE_MILES:
+        logger.info("[ROUTE] short trip %s -> %s, skipping ORS", start_coords, end_coords)
+        return _linestring_from_coords([start_coords, end_coords]), direct_miles
+
     cache_key = _route_cache_key(start_coords, end_coords)
     cached = cache.get(cache_key)
     if cached is not None:
         logger.info("[ROUTE] cache hit for %s -> %s", start_coords, end_coords)
         return cached
 
+    with _inflight_lock:
+        flight = _inflight.get(cache_key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _inflight[cache_key] = _RouteFlight()
+
+    if not is_leader:
+        # Same route already in flight: share its outcome instead of calling ORS
+        # again, so a failing ORS sees one call (plus retries), not one per caller
+        if not flight.done.wait(timeout=_INFLIGHT_WAIT):
+            raise ValueError("Route service timed out")
+        if flight.error is not None:
+            raise flight.error
+        logger.info("[ROUTE] coalesced %s -> %s", start_coords, end_coords)
+        return flight.result
+
+    try:
+        flight.result = _fetch_route(start_coords, end_coords, cache_key)
+        return flight.result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[cache_key]
+        flight.done.set()
+
+
+def _fetch_route(
+    start_coords: tuple[float, float],
+    end_coords: tuple[float, float],
+    cache_key: str,
+) -> tuple[LineString, float]:
+    """POST to ORS, parse the GeoJSON and cache ``(route_geom, total_miles)``."""
     session = _get_http_session()
-    headers = {"Authorization": settings.ORS_API_KEY}
-    body: dict[str, Any] = {
-        "coordinates": [list(start_coords), list(end_coords)],
-    }
-    response = session.post(ORS_ROUTE_URL, json=body, headers=headers, timeout=30)
-    data: dict[str, Any] = response.json()
+    payload = orjson.dumps(
+        {
+            "coordinates": [start_coords, end_coords],
+            # Only geometry + summary are used; turn-by-turn steps are most of the body
+            "instructions": False,
+        }
+    )
+    response = session.post(
+        ORS_ROUTE_URL, data=payload, headers=_get_ors_headers(), timeout=ORS_TIMEOUT
+    )
+    data: dict[str, Any] = orjson.loads(response.content)
 
     if response.status_code != 200:
         msg = data.get("error", {}).get("message", response.text) or "Route not found"
@@ -145,7 +346,7 @@ def get_route(
         raise ValueError("No route returned")
 
     coords = data["features"][0]["geometry"]["coordinates"]
-    route_geom = LineString(coords, srid=4326)
+    route_geom = _linestring_from_coords(coords)
     dist_meters: float = data["features"][0]["properties"]["summary"]["distance"]
     total_miles = dist_meters * METERS_TO_MILES
 
@@ -168,8 +369,9 @@ def prefilter_stations(
     segment_miles: int = PREFILTER_SEGMENT_MI,
 ) -> list[RouteNode]:
     """
-    Group stations into ``segment_miles``-long segments along the route
-    and return only the cheapest station per segment.
+    Sweep the stations in mileage order, grouping them into clusters that
+    span at most ``segment_miles``, and return only the cheapest station
+    per cluster.
 
     Eliminates micro-stops without significantly affecting total cost,
     and reduces the number of DAG nodes.
@@ -177,17 +379,102 @@ def prefilter_stations(
     if not station_nodes:
         return []
 
-    buckets: dict[int, list[RouteNode]] = defaultdict(list)
-    for node in station_nodes:
-        bucket_id = int(node["mileage"] / segment_miles)
-        buckets[bucket_id].append(node)
+    n = len(station_nodes)
+    mileages = np.fromiter(
+        (s["mileage"] for s in station_nodes), dtype=np.float64, count=n
+    )
+    prices = np.fromiter(
+        (s["price"] for s in station_nodes), dtype=np.float64, count=n
+    )
+    keep = _prefilter_indices(mileages, prices, segment_miles)
+    return [station_nodes[i] for i in keep]
+
+
+def _prefilter_indices(
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    segment_miles: int,
+) -> list[int]:
+    """
+    Index of the cheapest station per cluster, in mileage order. A cluster
+    starts at the first station not yet covered and takes every station
+    within ``segment_miles`` of it (ties keep the earliest station), so two
+    stations a mile apart are never split by a fixed segment boundary.
+    """
+    n = len(mileages)
+    if n < PREFILTER_NUMPY_MIN:
+        mileage_list: list[float] = mileages.tolist()
+        price_list: list[float] = prices.tolist()
+        keep: list[int] = []
+        best = -1
+        cluster_start = 0.0
+        for i in sorted(range(n), key=mileage_list.__getitem__):
+            if best == -1 or mileage_list[i] - cluster_start > segment_miles:
+                if best != -1:
+                    keep.append(best)
+                best, cluster_start = i, mileage_list[i]
+            elif price_list[i] < price_list[best]:
+                best = i
+        if best != -1:
+            keep.append(best)
+        return keep
+
+    order = np.argsort(mileages, kind="stable")
+    sorted_mileages = mileages[order]
+    if (np.diff(sorted_mileages) > segment_miles).all():
+        # Sparse route: every station is its own cluster, keep them all
+        return order.tolist()
+
+    sorted_prices = prices[order]
+    if _cluster_cheapest_jit is not None:
+        out = np.empty(n, dtype=np.int64)
+        count = _cluster_cheapest_jit(
+            sorted_mileages, sorted_prices, float(segment_miles), out
+        )
+        return order[out[:count]].tolist()
+
+    # One iteration per cluster: jump to its end, argmin over its prices
+    ends = np.searchsorted(
+        sorted_mileages, sorted_mileages + segment_miles, side="right"
+    )
+    keep_sorted: list[int] = []
+    i = 0
+    while i < n:
+        end = int(ends[i])
+        keep_sorted.append(i + int(np.argmin(sorted_prices[i:end])))
+        i = end
+    return order[keep_sorted].tolist()
 
-    filtered: list[RouteNode] = []
-    for bucket_id in sorted(buckets):
-        cheapest = min(buckets[bucket_id], key=lambda n: n["price"])
-        filtered.append(cheapest)
 
-    return filtered
+def warm_up_kernels() -> None:
+    """
+    Specialize the optional numba kernels on a tiny input so a fresh worker
+    pays the compile (or on-disk cache load) at startup, not on its first
+    route. No-op without numba.
+    """
+    mileages = np.array([0.0, 1.0])
+    prices = np.zeros(2)
+    if _cluster_cheapest_jit is not None:
+        _cluster_cheapest_jit(mileages, prices, 1.0, np.empty(2, dtype=np.int64))
+    if _relax_jit is not None:
+        _relax_jit(mileages, prices, 1.0, 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Station cache invalidation
+# ---------------------------------------------------------------------------
+
+
+def station_cache_invalidate() -> None:
+    """
+    Bump the stations epoch so every cached route -> stations entry
+    (``station_rows_on_route``) is ignored from now on.
+    """
+    cache.add(STATIONS_CACHE_EPOCH_KEY, 0, None)
+    try:
+        cache.incr(STATIONS_CACHE_EPOCH_KEY)
+    except ValueError:  # evicted between add and incr
+        cache.set(STATIONS_CACHE_EPOCH_KEY, 1, None)
 
 
 # ---------------------------------------------------------------------------
@@ -195,32 +482,48 @@ def prefilter_stations(
 # ---------------------------------------------------------------------------
 
 
-def _build_station_nodes(
-    stations_qs,
+def _station_arrays(station_rows) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ``(mileages, prices)`` columns of the station rows as ``float64`` arrays
+    (rows are ``STATION_ROW_FIELDS`` tuples: mileage, price, ...).
+    """
+    n = len(station_rows)
+    mileages = np.fromiter((s[0] for s in station_rows), dtype=np.float64, count=n)
+    prices = np.fromiter((s[1] for s in station_rows), dtype=np.float64, count=n)
+    return mileages, prices
+
+
+def _build_node_arrays(
+    station_rows,
+    mileages: np.ndarray,
+    prices: np.ndarray,
+    indices: list[int],
+    *,
+    start_ll: tuple[float, float],
+    end_ll: tuple[float, float],
     total_miles: float,
-) -> list[RouteNode]:
-    """Convert a FuelStation queryset annotated with ``fraction`` into RouteNodes."""
-    nodes: list[RouteNode] = []
-    for s in stations_qs:
-        fraction = getattr(s, "fraction", None)
-        if fraction is None:
-            continue
-        mileage = float(fraction) * total_miles
-        pt = s.location
-        lat: float = pt.y if hasattr(pt, "y") else pt.coords[1]
-        lon: float = pt.x if hasattr(pt, "x") else pt.coords[0]
-        nodes.append(
-            RouteNode(
-                mileage=mileage,
-                price=float(s.retail_price),
-                lat=lat,
-                lon=lon,
-                name=s.name,
-                address=s.address or "",
-                station_id=s.opis_id,
-            )
-        )
-    return nodes
+) -> NodeArrays:
+    """Start + the selected rows (``indices``) + Finish, as parallel arrays."""
+    kept = [station_rows[i] for i in indices]
+    n = len(kept) + 2
+    lats = np.empty(n, dtype=np.float64)
+    lons = np.empty(n, dtype=np.float64)
+    lats[0], lons[0] = start_ll
+    lats[-1], lons[-1] = end_ll
+    lats[1:-1] = [s[2] for s in kept]
+    lons[1:-1] = [s[3] for s in kept]
+
+    meta = [("Start", "", None)]
+    meta.extend((name, address or "", opis_id) for *_, name, address, opis_id in kept)
+    meta.append(("Finish", "", None))
+
+    return NodeArrays(
+        mileage=np.concatenate(([0.0], mileages[indices], [total_miles])),
+        price=np.concatenate(([0.0], prices[indices], [0.0])),
+        lat=lats,
+        lon=lons,
+        meta=meta,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -249,33 +552,23 @@ def route_plan(*, start: str, end: str) -> dict[str, Any]:
     route_geom, total_miles = get_route(start_coords, end_coords)
 
     # Find stations along the route (selector)
-    stations_qs = station_list_on_route(route_geom=route_geom)
-    station_nodes = _build_station_nodes(stations_qs, total_miles)
-    station_nodes = prefilter_stations(station_nodes)
-
-    # Build full node list: Start + stations + Finish
-    start_node = RouteNode(
-        mileage=0.0,
-        price=0.0,
-        lat=start_ll[0],
-        lon=start_ll[1],
-        name="Start",
-        address="",
-        station_id=None,
+    station_rows = station_rows_on_route(
+        route_geom=route_geom, route_length_miles=total_miles
     )
-    finish_node = RouteNode(
-        mileage=total_miles,
-        price=0.0,
-        lat=end_ll[0],
-        lon=end_ll[1],
-        name="Finish",
-        address="",
-        station_id=None,
+    # Prefilter on the numeric columns; RouteNodes only for the stops on the path
+    station_mileages, station_prices = _station_arrays(station_rows)
+    keep = _prefilter_indices(station_mileages, station_prices, PREFILTER_SEGMENT_MI)
+    nodes = _build_node_arrays(
+        station_rows,
+        station_mileages,
+        station_prices,
+        keep,
+        start_ll=start_ll,
+        end_ll=end_ll,
+        total_miles=total_miles,
     )
-    nodes = [start_node] + station_nodes + [finish_node]
-
-    path_stops, total_cost, total_gallons = optimize_refuel_dag(
-        nodes, total_miles, range_mi=VEHICLE_RANGE_MI, mpg=VEHICLE_MPG
+    path_stops, total_cost, total_gallons = optimize_refuel_arrays(
+        nodes.mileage, nodes.price, nodes, range_mi=VEHICLE_RANGE_MI, mpg=VEHICLE_MPG
     )
 
     if total_cost is None:
@@ -284,7 +577,7 @@ def route_plan(*, start: str, end: str) -> dict[str, Any]:
         )
 
     # Build route GeoJSON
-    coords = [[c[0], c[1]] for c in route_geom.coords]
+    coords = _linestring_coords(route_geom).tolist()
     route_geojson: dict[str, Any] = {
         "type": "Feature",
         "geometry": {"type": "LineString", "coordinates": coords},
@@ -0,0 +1,15 @@
+"""
+Signal receivers — keep the route -> stations cache consistent with the DB.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import FuelStation
+from core.services import station_cache_invalidate
+
+
+@receiver(post_save, sender=FuelStation)
+@receiver(post_delete, sender=FuelStation)
+def fuel_station_changed(sender, **kwargs) -> None:
+    station_cache_invalidate()
@@ -5,6 +5,7 @@ API tests for RoutePlanApi — mocks the service layer (core.views.route_plan).
 from decimal import Decimal
 from unittest.mock import patch
 
+import numpy as np
 from django.contrib.gis.geos import LineString
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -21,6 +22,24 @@ class RoutePlanApiTestCase(APITestCase):
         response = self.client.get("/api/route/", {"start": "40.7,-74.0"})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_blank_start_returns_400(self):
+        response = self.client.get("/api/route/", {"start": "  ", "end": "40.7,-74.0"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("start", response.json()["detail"])
+
+    def test_non_string_end_returns_400(self):
+        response = self.client.post(
+            "/api/route/", {"start": "40,-74", "end": 41}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("end", response.json()["detail"])
+
+    @patch("core.views.route_plan")
+    def test_input_is_stripped_before_route_plan(self, mock_route_plan):
+        mock_route_plan.side_effect = ValueError("stop")
+        self.client.get("/api/route/", {"start": " 40,-74 ", "end": "41,-73"})
+        mock_route_plan.assert_called_once_with(start="40,-74", end="41,-73")
+
     @patch("core.views.route_plan")
     def test_valid_request_returns_200_and_schema(self, mock_route_plan):
         mock_route_plan.return_value = {
@@ -164,3 +183,25 @@ class RoutePlanApiTestCase(APITestCase):
             self.assertIn(key, stop)
         self.assertEqual(stop["name"], "Stop A")
         self.assertEqual(stop["cost"], 90.0)
+
+    @patch("core.views.route_plan")
+    def test_response_renders_numpy_floats_as_json(self, mock_route_plan):
+        mock_route_plan.return_value = {
+            "route_geojson": {
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": [[-74.0, 40.0]]},
+                "properties": {},
+            },
+            "stops": [{"mileage": np.float64(300.0), "cost": np.float64(90.5)}],
+            "total_fuel_cost": 90.5,
+            "total_gallons": 30.0,
+            "total_miles": 600.0,
+            "mpg_used": 10,
+        }
+        response = self.client.get(
+            "/api/route/",
+            {"start": "40,-74", "end": "41,-73"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()["stops"][0]["cost"], 90.5)
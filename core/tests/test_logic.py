@@ -1,6 +1,16 @@
 from decimal import Decimal
+from unittest import skipIf
+
+import numpy as np
 from django.test import TestCase
-from core.logic import optimize_refuel_dag
+
+from core.logic import (
+    NodeArrays,
+    _relax_jit,
+    _relax_numpy,
+    optimize_refuel_arrays,
+    optimize_refuel_dag,
+)
 
 
 class OptimizeRefuelDAGTestCase(TestCase):
@@ -143,3 +153,76 @@ class OptimizeRefuelDAGTestCase(TestCase):
         self.assertAlmostEqual(path_stops[0]["gallons"], 5.0, places=5)  # 100 mi / 20 mpg (S1->Finish)
         self.assertAlmostEqual(float(total_cost), 20.0, places=5)  # 5 gal * $4
         self.assertAlmostEqual(float(total_gallons), 10.0, places=5)  # 200 mi / 20 mpg total
+
+    def test_predecessor_choice_depends_on_price(self):
+        # A has the lower "min_cost - mileage * price / mpg" key (-50 vs -20),
+        # but B is cheaper for reaching Finish: 350 mi @ $1 vs 450 mi @ $5.
+        nodes = [
+            {"mileage": 0, "price": 0},
+            {"mileage": 100, "price": 5.0, "name": "A"},
+            {"mileage": 200, "price": 1.0, "name": "B"},
+            {"mileage": 550, "price": 0},
+        ]
+        path_stops, total_cost, _ = optimize_refuel_dag(nodes, 550, range_mi=500, mpg=10)
+        self.assertEqual([s["name"] for s in path_stops], ["B"])
+        self.assertAlmostEqual(float(total_cost), 35.0, places=5)
+
+
+class OptimizeRefuelArraysTestCase(TestCase):
+    """optimize_refuel_arrays (SoA input) must match optimize_refuel_dag."""
+
+    def test_matches_node_list_api(self):
+        nodes = [
+            {"mileage": 0, "price": 0, "name": "Start"},
+            {"mileage": 250, "price": 2.0, "name": "A"},
+            {"mileage": 750, "price": 5.0, "name": "B"},
+            {"mileage": 1000, "price": 0, "name": "Finish"},
+        ]
+        mileages = np.array([0, 250, 750, 1000], dtype=np.float64)
+        prices = np.array([0, 2.0, 5.0, 0], dtype=np.float64)
+        expected = optimize_refuel_dag(nodes, 1000, range_mi=500, mpg=10)
+        result = optimize_refuel_arrays(mileages, prices, nodes, range_mi=500, mpg=10)
+        self.assertEqual(result, expected)
+
+    def test_start_price_ignored_and_input_not_mutated(self):
+        nodes = [{"mileage": 0}, {"mileage": 100}]
+        prices = np.array([9.0, 0.0])
+        _, total_cost, _ = optimize_refuel_arrays(np.array([0.0, 100.0]), prices, nodes)
+        self.assertEqual(total_cost, Decimal("0"))
+        self.assertEqual(prices[0], 9.0)
+
+    def test_node_arrays_match_node_list(self):
+        nodes = NodeArrays(
+            mileage=np.array([0, 250, 750, 1000], dtype=np.float64),
+            price=np.array([0, 2.0, 5.0, 0], dtype=np.float64),
+            lat=np.array([40.0, 39.5, 39.0, 38.5]),
+            lon=np.array([-100.0, -99.0, -98.0, -97.0]),
+            meta=[
+                ("Start", "", None),
+                ("A", "1 Main St", 11),
+                ("B", "", 12),
+                ("Finish", "", None),
+            ],
+        )
+        self.assertEqual(len(nodes), 4)
+        self.assertEqual(nodes[1]["station_id"], 11)
+        self.assertEqual(nodes[1]["lat"], 39.5)
+        expected = optimize_refuel_dag(list(nodes), 1000, range_mi=500, mpg=10)
+        result = optimize_refuel_arrays(
+            nodes.mileage, nodes.price, nodes, range_mi=500, mpg=10
+        )
+        self.assertEqual(result, expected)
+        self.assertEqual(result[0][0]["name"], "A")
+
+
+class RelaxKernelTestCase(TestCase):
+    """The numba kernel (when installed) must match the NumPy fallback."""
+
+    @skipIf(_relax_jit is None, "numba not installed")
+    def test_jit_matches_numpy(self):
+        mileages = np.array([0, 120, 350, 480, 700, 900, 1000], dtype=np.float64)
+        prices = np.array([0, 3.2, 2.9, 3.5, 3.1, 2.8, 0], dtype=np.float64)
+        cost_np, parent_np = _relax_numpy(mileages, prices, 500.0, 10.0)
+        cost_jit, parent_jit = _relax_jit(mileages, prices, 500.0, 10.0)
+        np.testing.assert_allclose(cost_jit, cost_np)
+        np.testing.assert_array_equal(parent_jit, parent_np)
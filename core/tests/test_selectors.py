@@ -1,7 +1,15 @@
-from django.contrib.gis.geos import LineString
+from decimal import Decimal
+
+from django.contrib.gis.geos import LineString, Point
+from django.core.cache import cache
 from django.test import TestCase
 
-from core.selectors import station_list_on_route
+from core.models import FuelStation
+from core.selectors import (
+    STATION_ROW_FIELDS,
+    station_list_on_route,
+    station_rows_on_route,
+)
 
 
 class StationListOnRouteTestCase(TestCase):
@@ -9,13 +17,78 @@ class StationListOnRouteTestCase(TestCase):
 
     def test_returns_queryset_with_fraction(self):
         line = LineString([(-74.0, 40.0), (-73.99, 40.01)], srid=4326)
-        qs = station_list_on_route(route_geom=line)
+        qs = station_list_on_route(route_geom=line, route_length_miles=100.0)
         # May be empty if no stations in DB, but should not error
         self.assertTrue(hasattr(qs, "order_by"))
         list(qs)  # no error
 
     def test_queryset_ordered_by_fraction(self):
         line = LineString([(-100.0, 35.0), (-99.0, 35.0)], srid=4326)
-        qs = station_list_on_route(route_geom=line)
+        qs = station_list_on_route(route_geom=line, route_length_miles=100.0)
         self.assertTrue(hasattr(qs.query, "order_by"))
         self.assertTrue(qs.query.order_by)
+
+    def test_rows_are_dicts_with_unpacked_coords(self):
+        FuelStation.objects.create(
+            opis_id=1,
+            name="A",
+            address="1 Main St",
+            city="Amarillo",
+            state="TX",
+            retail_price=Decimal("3.100"),
+            location=Point(-99.5, 35.0, srid=4326),
+        )
+        line = LineString([(-100.0, 35.0), (-99.0, 35.0)], srid=4326)
+        rows = list(station_list_on_route(route_geom=line, route_length_miles=100.0))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["opis_id"], 1)
+        self.assertAlmostEqual(rows[0]["lon"], -99.5, places=6)
+        self.assertAlmostEqual(rows[0]["lat"], 35.0, places=6)
+        self.assertAlmostEqual(rows[0]["mileage"], 50.0, places=1)
+
+
+class StationRowsOnRouteTestCase(TestCase):
+    """Tests for the cached station_rows_on_route selector."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_call_hits_cache_until_stations_change(self):
+        line = LineString([(-100.0, 35.0), (-99.0, 35.0)], srid=4326)
+        self.assertEqual(station_rows_on_route(route_geom=line, route_length_miles=57.0), [])
+        with self.assertNumQueries(0):
+            station_rows_on_route(route_geom=line, route_length_miles=57.0)
+
+        # post_save bumps the stations epoch -> cache miss
+        FuelStation.objects.create(
+            opis_id=2,
+            name="B",
+            address="2 Main St",
+            city="Amarillo",
+            state="TX",
+            retail_price=Decimal("3.200"),
+            location=Point(-99.5, 35.0, srid=4326),
+        )
+        rows = station_rows_on_route(route_geom=line, route_length_miles=57.0)
+        self.assertEqual([r[-1] for r in rows], [2])
+
+    def test_rows_are_tuples_in_field_order(self):
+        FuelStation.objects.create(
+            opis_id=3,
+            name="C",
+            address="3 Main St",
+            city="Amarillo",
+            state="TX",
+            retail_price=Decimal("3.300"),
+            location=Point(-99.5, 35.0, srid=4326),
+        )
+        line = LineString([(-100.0, 35.0), (-99.0, 35.0)], srid=4326)
+        (row,) = station_rows_on_route(route_geom=line, route_length_miles=100.0)
+        self.assertEqual(len(row), len(STATION_ROW_FIELDS))
+        mileage, price, lat, lon, name, address, opis_id = row
+        self.assertAlmostEqual(mileage, 50.0, places=1)
+        self.assertIsInstance(price, float)
+        self.assertAlmostEqual(price, 3.3, places=6)
+        self.assertAlmostEqual(lat, 35.0, places=6)
+        self.assertAlmostEqual(lon, -99.5, places=6)
+        self.assertEqual((name, address, opis_id), ("C", "3 Main St", 3))
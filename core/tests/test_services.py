@@ -1,9 +1,25 @@
+import threading
+import time
+from unittest import skipIf
 from unittest.mock import MagicMock, patch
 
+import numpy as np
+import orjson
 from django.contrib.gis.geos import LineString
-from django.test import TestCase
-
-from core.services import geocode_to_coords, get_route, prefilter_stations
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from geopy.exc import GeocoderTimedOut
+
+from core.services import (
+    _cluster_cheapest_jit,
+    _geocode_address,
+    _get_http_session,
+    _prefilter_indices,
+    _route_cache_key,
+    geocode_to_coords,
+    get_route,
+    prefilter_stations,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -14,6 +30,10 @@ from core.services import geocode_to_coords, get_route, prefilter_stations
 class GeocodeToCoordsTestCase(TestCase):
     """Tests for geocode_to_coords."""
 
+    def setUp(self):
+        cache.clear()
+        _geocode_address.cache_clear()
+
     def test_empty_returns_none(self):
         self.assertIsNone(geocode_to_coords(""))
         self.assertIsNone(geocode_to_coords(None))
@@ -31,6 +51,17 @@ class GeocodeToCoordsTestCase(TestCase):
         self.assertAlmostEqual(result[0], -33.5, places=5)
         self.assertAlmostEqual(result[1], 150.2, places=5)
 
+    @patch("core.services._get_geolocator")
+    def test_lat_lon_trailing_dot_skips_geocoder(self, mock_get_geo):
+        self.assertEqual(geocode_to_coords(" 40., -74. "), (40.0, -74.0))
+        mock_get_geo.assert_not_called()
+
+    @patch("core.services._get_geolocator")
+    def test_non_finite_pair_is_geocoded(self, mock_get_geo):
+        mock_get_geo.return_value.geocode.return_value = None
+        self.assertIsNone(geocode_to_coords("nan, inf"))
+        mock_get_geo.return_value.geocode.assert_called_once()
+
     @patch("core.services._get_geolocator")
     def test_address_calls_geocoder(self, mock_get_geo):
         mock_geo = MagicMock()
@@ -44,6 +75,48 @@ class GeocodeToCoordsTestCase(TestCase):
         self.assertEqual(result, (40.0, -74.0))
         mock_geo.geocode.assert_called_once()
 
+    @patch("core.services._get_geolocator")
+    def test_address_cached_after_first_lookup(self, mock_get_geo):
+        mock_loc = MagicMock(latitude=41.88, longitude=-87.63)
+        mock_get_geo.return_value.geocode.return_value = mock_loc
+        self.assertEqual(geocode_to_coords("Chicago, IL"), (41.88, -87.63))
+        self.assertEqual(geocode_to_coords("  chicago,   il "), (41.88, -87.63))
+        mock_get_geo.return_value.geocode.assert_called_once()
+
+    @patch("core.services._get_geolocator")
+    def test_not_found_is_cached(self, mock_get_geo):
+        mock_get_geo.return_value.geocode.return_value = None
+        self.assertIsNone(geocode_to_coords("Nowhere Land"))
+        self.assertIsNone(geocode_to_coords("Nowhere Land"))
+        mock_get_geo.return_value.geocode.assert_called_once()
+
+    @patch("core.services._get_geolocator")
+    def test_not_found_is_not_memoized_past_shared_cache(self, mock_get_geo):
+        mock_get_geo.return_value.geocode.return_value = None
+        self.assertIsNone(geocode_to_coords("Nowhere Land"))
+        cache.clear()  # shared-cache entry expired
+        self.assertIsNone(geocode_to_coords("Nowhere Land"))
+        self.assertEqual(mock_get_geo.return_value.geocode.call_count, 2)
+
+    @patch("core.services._get_geolocator")
+    def test_repeat_address_skips_shared_cache(self, mock_get_geo):
+        mock_get_geo.return_value.geocode.return_value = MagicMock(
+            latitude=29.76, longitude=-95.37
+        )
+        geocode_to_coords("Houston, TX")
+        with patch("core.services.cache") as mock_cache:
+            self.assertEqual(geocode_to_coords("Houston, TX"), (29.76, -95.37))
+            mock_cache.get.assert_not_called()
+
+    @patch("core.services._get_geolocator")
+    def test_transient_error_is_not_memoized(self, mock_get_geo):
+        mock_get_geo.return_value.geocode.side_effect = [
+            GeocoderTimedOut(),
+            MagicMock(latitude=32.78, longitude=-96.80),
+        ]
+        self.assertIsNone(geocode_to_coords("Dallas, TX"))
+        self.assertEqual(geocode_to_coords("Dallas, TX"), (32.78, -96.80))
+
     def test_invalid_lat_lon_out_of_bounds_returns_none(self):
         self.assertIsNone(geocode_to_coords("91, 0"))
         self.assertIsNone(geocode_to_coords("0, 181"))
@@ -54,6 +127,57 @@ class GeocodeToCoordsTestCase(TestCase):
         self.assertIsNone(geocode_to_coords("\t"))
 
 
+# ---------------------------------------------------------------------------
+# _route_cache_key
+# ---------------------------------------------------------------------------
+
+
+class RouteCacheKeyTestCase(TestCase):
+    """Tests for _route_cache_key."""
+
+    def test_same_key_within_precision(self):
+        a = _route_cache_key((-74.0, 40.0), (-73.9, 40.1))
+        b = _route_cache_key((-74.0002, 40.0001), (-73.9, 40.1003))
+        self.assertEqual(a, b)
+        self.assertTrue(a.startswith("ors_route:"))
+
+    def test_points_beyond_precision_get_distinct_keys(self):
+        self.assertNotEqual(
+            _route_cache_key((-74.0, 40.0), (-73.9, 40.1)),
+            _route_cache_key((-74.0, 40.0), (-73.9, 40.102)),
+        )
+
+    @override_settings(ROUTE_CACHE_PRECISION=6)
+    def test_precision_is_configurable(self):
+        self.assertNotEqual(
+            _route_cache_key((-74.0, 40.0), (-73.9, 40.1)),
+            _route_cache_key((-74.0002, 40.0), (-73.9, 40.1)),
+        )
+
+    def test_direction_matters(self):
+        self.assertNotEqual(
+            _route_cache_key((-74.0, 40.0), (-73.9, 40.1)),
+            _route_cache_key((-73.9, 40.1), (-74.0, 40.0)),
+        )
+
+
+# ---------------------------------------------------------------------------
+# _get_http_session
+# ---------------------------------------------------------------------------
+
+
+class HttpSessionTestCase(TestCase):
+    """Tests for the shared ORS session."""
+
+    @patch("core.services._http_session", None)
+    def test_https_adapter_pools_and_retries(self):
+        adapter = _get_http_session().get_adapter("https://api.openrouteservice.org")
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 32)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertIn("POST", adapter.max_retries.allowed_methods)
+
+
 # ---------------------------------------------------------------------------
 # get_route (mocking _get_http_session instead of requests.post)
 # ---------------------------------------------------------------------------
@@ -67,7 +191,7 @@ class GetRouteTestCase(TestCase):
         mock_session = MagicMock()
         mock_response = MagicMock()
         mock_response.status_code = status_code
-        mock_response.json.return_value = json_data
+        mock_response.content = orjson.dumps(json_data)
         mock_response.text = text
         mock_session.post.return_value = mock_response
         mock_get_session.return_value = mock_session
@@ -75,7 +199,7 @@ class GetRouteTestCase(TestCase):
 
     @patch("core.services._get_http_session")
     def test_get_route_returns_geometry_and_miles(self, mock_get_session):
-        self._mock_session_post(
+        mock_session = self._mock_session_post(
             mock_get_session,
             status_code=200,
             json_data={
@@ -88,7 +212,12 @@ class GetRouteTestCase(TestCase):
             },
         )
         route_geom, total_miles = get_route((-74.0, 40.0), (-73.9, 40.1))
+        body = orjson.loads(mock_session.post.call_args.kwargs["data"])
+        self.assertEqual(body["coordinates"], [[-74.0, 40.0], [-73.9, 40.1]])
+        self.assertIs(body["instructions"], False)
         self.assertIsInstance(route_geom, LineString)
+        self.assertEqual(route_geom.srid, 4326)
+        self.assertEqual(route_geom.coords, ((-74.0, 40.0), (-73.9, 40.1)))
         self.assertGreater(total_miles, 0)
         self.assertLess(total_miles, 20)
 
@@ -132,6 +261,103 @@ class GetRouteTestCase(TestCase):
         _, total_miles = get_route((-74.0, 40.0), (-73.9, 40.0))
         self.assertAlmostEqual(total_miles, 10.0, places=2)
 
+    @patch("core.services._get_http_session")
+    def test_short_trip_skips_ors(self, mock_get_session):
+        route_geom, total_miles = get_route((-74.0, 40.0), (-74.0, 40.01))
+        mock_get_session.assert_not_called()
+        self.assertEqual(route_geom.coords, ((-74.0, 40.0), (-74.0, 40.01)))
+        self.assertEqual(route_geom.srid, 4326)
+        self.assertAlmostEqual(total_miles, 0.69, places=2)
+
+    @override_settings(ORS_MIN_DISTANCE_MILES=0)
+    @patch("core.services._get_http_session")
+    def test_short_trip_uses_ors_when_shortcut_disabled(self, mock_get_session):
+        mock_session = self._mock_session_post(
+            mock_get_session,
+            status_code=200,
+            json_data={
+                "features": [
+                    {
+                        "geometry": {"coordinates": [[-74.0, 40.0], [-74.0, 40.01]]},
+                        "properties": {"summary": {"distance": 1500.0}},
+                    }
+                ]
+            },
+        )
+        get_route((-74.0, 40.0), (-74.0, 40.01))
+        mock_session.post.assert_called_once()
+
+    @patch("core.services._get_http_session")
+    def test_concurrent_misses_share_one_ors_call(self, mock_get_session):
+        mock_session = self._mock_session_post(
+            mock_get_session,
+            status_code=200,
+            json_data={
+                "features": [
+                    {
+                        "geometry": {"coordinates": [[-80.0, 35.0], [-79.0, 36.0]]},
+                        "properties": {"summary": {"distance": 160934.4}},
+                    }
+                ]
+            },
+        )
+        response = mock_session.post.return_value
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.2)
+            return response
+
+        mock_session.post.side_effect = slow_post
+        cache.delete(_route_cache_key((-80.0, 35.0), (-79.0, 36.0)))
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_route((-80.0, 35.0), (-79.0, 36.0)))
+            )
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_session.post.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(miles == results[0][1] for _, miles in results))
+
+    @patch("core.services._get_http_session")
+    def test_concurrent_misses_share_leader_failure(self, mock_get_session):
+        mock_session = self._mock_session_post(
+            mock_get_session,
+            status_code=503,
+            json_data={"error": {"message": "Service unavailable"}},
+        )
+        response = mock_session.post.return_value
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.2)
+            return response
+
+        mock_session.post.side_effect = slow_post
+        cache.delete(_route_cache_key((-81.0, 34.0), (-80.0, 35.0)))
+
+        errors = []
+
+        def call():
+            try:
+                get_route((-81.0, 34.0), (-80.0, 35.0))
+            except ValueError as exc:
+                errors.append(str(exc))
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_session.post.call_count, 1)
+        self.assertEqual(errors, ["Service unavailable"] * 4)
 
 # ---------------------------------------------------------------------------
 # prefilter_stations
@@ -205,6 +431,46 @@ class PrefilterStationsTestCase(TestCase):
         self.assertEqual(result[0]["lat"], 40.0)
         self.assertEqual(result[0]["address"], "123 St")
 
+    def test_large_input_keeps_cheapest_per_cluster(self):
+        """Enough stations to take the vectorized (NumPy) path."""
+        nodes = [
+            {"mileage": float(m), "price": 3.0 + (m % 7) / 10, "name": f"S{m}"}
+            for m in range(0, 500, 5)
+        ]
+        result = prefilter_stations(nodes, segment_miles=50)
+        # Clusters start at 0, 55, 110, ... and each spans 50 miles (11 stations)
+        self.assertEqual(len(result), 10)
+        for k, node in enumerate(result):
+            start = 55 * k
+            in_cluster = [n for n in nodes if start <= n["mileage"] <= start + 50]
+            self.assertEqual(node["price"], min(n["price"] for n in in_cluster))
+            first_cheapest = next(n for n in in_cluster if n["price"] == node["price"])
+            self.assertIs(node, first_cheapest)
+
+    def test_stations_across_segment_boundary_share_a_cluster(self):
+        nodes = [
+            {"mileage": 24.9, "price": 3.0, "name": "A"},
+            {"mileage": 25.1, "price": 2.9, "name": "B"},
+        ]
+        result = prefilter_stations(nodes, segment_miles=25)
+        self.assertEqual([n["name"] for n in result], ["B"])
+
+    def test_large_sparse_input_keeps_every_station(self):
+        nodes = [
+            {"mileage": 60.0 * k + 1, "price": 3.0, "name": f"S{k}"} for k in range(40)
+        ]
+        self.assertEqual(prefilter_stations(nodes, segment_miles=50), nodes)
+
+    @skipIf(_cluster_cheapest_jit is None, "numba not installed")
+    def test_jit_sweep_matches_numpy(self):
+        rng = np.random.default_rng(7)
+        mileages = rng.uniform(0, 3000, 400).round(0)  # rounding forces ties
+        prices = rng.choice([2.9, 3.1, 3.3], 400)
+        jit_result = _prefilter_indices(mileages, prices, 50)
+        with patch("core.services._cluster_cheapest_jit", None):
+            numpy_result = _prefilter_indices(mileages, prices, 50)
+        self.assertEqual(jit_result, numpy_result)
+
     def test_output_sorted_by_segment(self):
         nodes = [
             {"mileage": 500, "price": 3.0, "name": "C"},
@@ -1,40 +1,25 @@
 """
 Views — thin, no business logic (HackSoft Django Styleguide).
 
-Responsibility: validate input, call service, serialize output.
+Responsibility: validate input, call service, render output.
 """
 
-from rest_framework import serializers, status
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.renderers import OrjsonRenderer
 from core.services import route_plan
 
 
 class RoutePlanApi(APIView):
     """POST or GET /api/route/ — plan a fuel-optimized route."""
 
-    class InputSerializer(serializers.Serializer):
-        start = serializers.CharField(required=True)
-        end = serializers.CharField(required=True)
-
-    class FuelStopOutputSerializer(serializers.Serializer):
-        mileage = serializers.FloatField()
-        lat = serializers.FloatField()
-        lon = serializers.FloatField()
-        name = serializers.CharField()
-        address = serializers.CharField()
-        price = serializers.FloatField()
-        gallons = serializers.FloatField()
-        cost = serializers.FloatField()
-
-    class OutputSerializer(serializers.Serializer):
-        route_geojson = serializers.DictField()
-        stops = serializers.ListField(child=serializers.DictField())
-        total_fuel_cost = serializers.FloatField()
-        total_gallons = serializers.FloatField()
-        total_miles = serializers.FloatField()
-        mpg_used = serializers.IntegerField()
+    INPUT_FIELDS = ("start", "end")
+
+    # route_plan's result is already JSON-native: render it directly
+    renderer_classes = [OrjsonRenderer]
 
     def get(self, request):
         return self._handle(request)
@@ -42,18 +27,40 @@ class RoutePlanApi(APIView):
     def post(self, request):
         return self._handle(request)
 
+    def _parse_input(self, data) -> dict[str, str]:
+        """
+        Inline equivalent of a two-``CharField`` serializer: required,
+        non-blank strings, whitespace-trimmed. Errors keep DRF's shape.
+        """
+        if not hasattr(data, "get"):
+            raise ValidationError(
+                {"non_field_errors": ["Invalid data. Expected a dictionary."]}
+            )
+        values, errors = {}, {}
+        for field in self.INPUT_FIELDS:
+            value = data.get(field)
+            if value is None:
+                errors[field] = ["This field is required."]
+            elif not isinstance(value, str):
+                errors[field] = ["Not a valid string."]
+            elif not (value := value.strip()):
+                errors[field] = ["This field may not be blank."]
+            else:
+                values[field] = value
+        if errors:
+            raise ValidationError(errors)
+        return values
+
     def _handle(self, request):
-        input_ser = self.InputSerializer(
-            data=request.query_params if request.method == "GET" else request.data
+        validated = self._parse_input(
+            request.query_params if request.method == "GET" else request.data
         )
-        input_ser.is_valid(raise_exception=True)
 
         try:
-            result = route_plan(**input_ser.validated_data)
+            result = route_plan(**validated)
         except ValueError as exc:
             return Response(
                 {"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        output_ser = self.OutputSerializer(result)
-        return Response(output_ser.data)
+        return Response(result)
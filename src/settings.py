@@ -18,7 +18,10 @@ SECRET_KEY = os.getenv(
     "django-insecure-)c*2wo9z52qaodx4@@&ez=%5uh1em%^p6orz=w#1@ii2nz9(($",
 )
 
-DEBUG = os.getenv("DJANGO_DEBUG", "True").lower() in ("true", "1", "yes")
+DEBUG = os.getenv("DJANGO_DEBUG", "False").lower() in ("true", "1", "yes")
+
+# Silk profiles every request (SQL + Python), so it is opt-in even in DEBUG
+SILK_ENABLED = DEBUG and os.getenv("DJANGO_PROFILE", "").lower() in ("true", "1", "yes")
 
 ALLOWED_HOSTS: list[str] = os.getenv("DJANGO_ALLOWED_HOSTS", "*").split(",")
 
@@ -37,8 +40,7 @@ INSTALLED_APPS = [
     "core",
 ]
 
-# Silk conditional on DEBUG
-if DEBUG:
+if SILK_ENABLED:
     INSTALLED_APPS.append("silk")
 
 MIDDLEWARE = [
@@ -51,7 +53,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-if DEBUG:
+if SILK_ENABLED:
     MIDDLEWARE.insert(0, "silk.middleware.SilkyMiddleware")
 
 ROOT_URLCONF = "src.urls"
@@ -84,6 +86,11 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "geopassword"),
         "HOST": os.getenv("DB_HOST", "db"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # Keep connections open across requests (skips connect + auth per
+        # request); health checks drop ones the server closed meanwhile.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"application_name": "routing-api"},
     }
 }
 
@@ -117,15 +124,13 @@ STATIC_URL = "static/"
 # ---------------------------------------------------------------------------
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "core.exceptions.custom_exception_handler",
-    "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
-    ],
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
 }
 
 # Enable Browsable API only in DEBUG
 if DEBUG:
-    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append(
-        "rest_framework.renderers.BrowsableAPIRenderer"
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] += (
+        "rest_framework.renderers.BrowsableAPIRenderer",
     )
 
 # ---------------------------------------------------------------------------
@@ -135,20 +140,51 @@ ORS_API_KEY = os.getenv("ORS_API_KEY", "")
 GOOGLE_GEOCODE_API_KEY = os.getenv("GOOGLE_GEOCODE_API_KEY", "")
 
 # ---------------------------------------------------------------------------
-# django-silk (profiling) — DEBUG only
+# django-silk (profiling) — DEBUG + DJANGO_PROFILE only
 # ---------------------------------------------------------------------------
-if DEBUG:
+if SILK_ENABLED:
     SILKY_PYTHON_PROFILER = True
 
+# ---------------------------------------------------------------------------
+# numba (optional)
+# ---------------------------------------------------------------------------
+# CoreConfig.ready() warms the JIT kernels at startup. Compiled code is cached
+# in core/__pycache__ (or NUMBA_CACHE_DIR, read from the environment by numba);
+# that directory must be writable, e.g. a volume in Docker, or every new
+# worker recompiles.
+
 # ---------------------------------------------------------------------------
 # Caches
 # ---------------------------------------------------------------------------
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "ors-route-cache",
+# Redis when REDIS_URL is set, so every worker shares one cached ORS route /
+# station lookup; per-process LocMemCache otherwise (tests, local runs).
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "routing",
+        }
     }
-}
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ors-route-cache",
+        }
+    }
+
+# Decimal places of start/end kept in the ORS route cache key. 3 (~110 m)
+# lets near-identical geocodes share a route; the cached route then starts
+# and ends at the first requester's exact points, and the key only reveals
+# locations at that precision.
+ROUTE_CACHE_PRECISION = int(os.getenv("ROUTE_CACHE_PRECISION", "3"))
+
+# Trips shorter than this (straight-line miles) skip ORS and use a direct
+# segment: far below the vehicle range, so the stop plan is the same and
+# only the drawn geometry is approximate. 0 disables the shortcut.
+ORS_MIN_DISTANCE_MILES = float(os.getenv("ORS_MIN_DISTANCE_MILES", "2"))
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -7,7 +7,7 @@ urlpatterns = [
     path("api/", include("core.urls")),
 ]
 
-if settings.DEBUG:
+if settings.SILK_ENABLED:
     urlpatterns += [
         path("silk/", include("silk.urls", namespace="silk")),
     ]
@@ -1,264 +1,423 @@
 """
 Gera um mapa interativo da rota com paradas de combustível.
-Uso: python test_map.py [start_lat,start_lon end_lat,end_lon]
+Uso: python test_map.py [--no-cache] [--gzip] [--check] [start_lat,start_lon end_lat,end_lon]
+     python test_map.py [--no-cache] [--gzip] [--check] --routes pares.txt   (um "start end" por linha)
+
+Com --check só consulta a API e imprime o resumo (folium nem é importado).
 """
+import argparse
+import gzip
+import hashlib
+import os
 import sys
-import folium
+import tempfile
+import time
+from functools import cache
+from itertools import pairwise
+from pathlib import Path
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 # ---------------------------------------------------------------------------
 # Configuração da rota
 # ---------------------------------------------------------------------------
 DEFAULT_START = "41.8781,-87.6298"   # Chicago
 DEFAULT_END = "29.7604,-95.3698"     # Houston
+# Casas decimais da geometria embutida no HTML (5 ≈ 1 m, invisível no mapa)
+COORD_PRECISION = int(os.getenv("MAP_COORD_PRECISION", "5"))
+# Tolerância do Douglas–Peucker em graus (0.0005 ≈ 50 m; 0 desliga)
+SIMPLIFY_TOLERANCE = float(os.getenv("MAP_SIMPLIFY_TOLERANCE", "0.0005"))
 
-start = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_START
-end = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_END
-
-print(f"Buscando rota: {start} → {end} ...")
-r = requests.get("http://localhost:8000/api/route/", params={"start": start, "end": end})
-if r.status_code != 200:
-    print(f"Erro {r.status_code}: {r.text}")
-    sys.exit(1)
+# Cache em disco da resposta da API: refazer o mapa não refaz a rota
+CACHE_DIR = Path(tempfile.gettempdir()) / "routecache"
+CACHE_TTL = 3600  # segundos
+API_URL = "http://localhost:8000/api/route/"
+API_TIMEOUT = (3, 120)  # connect, read (rota fria: geocode + ORS com retries)
 
-data = r.json()
-stops = data["stops"]
-total_miles = data["total_miles"]
-total_cost = data["total_fuel_cost"]
-total_gallons = data["total_gallons"]
-mpg = data["mpg_used"]
-
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-def color_by_price(price, prices):
-    """Verde = barato, vermelho = caro (relativo aos stops escolhidos)."""
-    if not prices:
-        return "red"
-    mn, mx = min(prices), max(prices)
-    if mx == mn:
-        return "orange"
-    ratio = (price - mn) / (mx - mn)
-    if ratio < 0.33:
-        return "green"
-    elif ratio < 0.66:
-        return "orange"
-    return "red"
+# Sessão persistente: scripts que chamam fetch_route em loop reusam a conexão
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
 
 
-# Precomputar preços dos stops
-stop_prices = [s["price"] for s in stops]
+def fetch_route(start, end, use_cache=True):
+    """Resposta de /api/route/ para ``start``/``end`` (do cache em disco se recente)."""
+    cache_file = CACHE_DIR / f"{hashlib.sha1(f'{start}|{end}'.encode()).hexdigest()}.json"
+    if (
+        use_cache
+        and cache_file.exists()
+        and time.time() - cache_file.stat().st_mtime < CACHE_TTL
+    ):
+        print(f"Rota em cache: {start} → {end}")
+        return orjson.loads(cache_file.read_bytes())
 
-# Pontos-chave: Start + Stops + End (usando mileage da rota, não haversine)
-start_lat, start_lon = map(float, start.split(","))
-end_lat, end_lon = map(float, end.split(","))
+    print(f"Buscando rota: {start} → {end} ...")
+    r = SESSION.get(API_URL, params={"start": start, "end": end}, timeout=API_TIMEOUT)
+    if r.status_code != 200:
+        raise RuntimeError(f"Erro {r.status_code}: {r.text}")
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_bytes(r.content)
+    return orjson.loads(r.content)
 
-waypoints = [
-    {"label": "Start", "lat": start_lat, "lon": start_lon, "mileage": 0}
-]
-for s in stops:
-    waypoints.append({
-        "label": s["name"],
-        "lat": s["lat"],
-        "lon": s["lon"],
-        "mileage": s.get("mileage", 0),
-    })
-waypoints.append({
-    "label": "End",
-    "lat": end_lat,
-    "lon": end_lon,
-    "mileage": total_miles,
-})
-
-# Distância entre waypoints consecutivos (pela rota, via mileage)
-for i in range(1, len(waypoints)):
-    prev_mi = waypoints[i - 1].get("mileage", 0) or 0
-    cur_mi = waypoints[i].get("mileage", 0) or 0
-    waypoints[i]["dist_from_prev"] = cur_mi - prev_mi
-
-# ---------------------------------------------------------------------------
-# Criar mapa
-# ---------------------------------------------------------------------------
-coords = data["route_geojson"]["geometry"]["coordinates"]
-mid = coords[len(coords) // 2]
-m = folium.Map(location=[mid[1], mid[0]], zoom_start=6, tiles="CartoDB positron")
-
-# Rota
-folium.GeoJson(
-    data["route_geojson"],
-    style_function=lambda x: {"color": "#2563eb", "weight": 5, "opacity": 0.8},
-    name="Rota",
-).add_to(m)
-
-# ---------------------------------------------------------------------------
-# Marcador Start
-# ---------------------------------------------------------------------------
-folium.Marker(
-    [start_lat, start_lon],
-    icon=folium.Icon(color="green", icon="play", prefix="fa"),
-    popup=folium.Popup(f"""
-        <div style="font-family:system-ui;min-width:180px">
-            <h4 style="margin:0 0 6px;color:#16a34a">🟢 Partida</h4>
-            <b>Coordenadas:</b> {start_lat:.4f}, {start_lon:.4f}<br>
-            <b>Rota total:</b> {total_miles:.0f} mi
-        </div>
-    """, max_width=300),
-).add_to(m)
 
 # ---------------------------------------------------------------------------
-# Marcadores dos Stops com detalhes
+# Templates (compilados uma vez; autoescape protege nomes/endereços com & < >)
 # ---------------------------------------------------------------------------
-for i, s in enumerate(stops):
-    wp = waypoints[i + 1]  # +1 porque waypoints[0] é Start
-    dist_prev = wp.get("dist_from_prev", 0)
-
-    # Distância até o próximo stop (ou End)
-    if i + 2 < len(waypoints):
-        dist_next = waypoints[i + 2].get("dist_from_prev", 0)
-    else:
-        dist_next = 0
-
-    icon_color = color_by_price(s["price"], stop_prices)
-    stop_num = i + 1
-
-    popup_html = f"""
+POPUP_SRC = """
     <div style="font-family:system-ui;min-width:220px;font-size:13px">
-        <h4 style="margin:0 0 8px;color:#dc2626">⛽ Parada {stop_num}/{len(stops)}</h4>
+        <h4 style="margin:0 0 8px;color:#dc2626">⛽ Parada {{ idx }}/{{ n }}</h4>
         <table style="border-collapse:collapse;width:100%">
             <tr><td style="padding:2px 8px 2px 0;color:#666">Posto</td>
-                <td style="padding:2px 0"><b>{s['name']}</b></td></tr>
+                <td style="padding:2px 0"><b>{{ stop.name }}</b></td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Endereço</td>
-                <td style="padding:2px 0">{s.get('address', 'N/A')}</td></tr>
+                <td style="padding:2px 0">{{ stop.get("address", "N/A") }}</td></tr>
             <tr><td colspan="2"><hr style="margin:4px 0;border-color:#eee"></td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Preço/gal</td>
-                <td style="padding:2px 0"><b>${s['price']:.3f}</b></td></tr>
+                <td style="padding:2px 0"><b>${{ "%.3f"|format(stop.price) }}</b></td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Galões</td>
-                <td style="padding:2px 0">{s['gallons']:.1f} gal</td></tr>
+                <td style="padding:2px 0">{{ "%.1f"|format(stop.gallons) }} gal</td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Custo</td>
-                <td style="padding:2px 0"><b>${s['cost']:.2f}</b></td></tr>
+                <td style="padding:2px 0"><b>${{ "%.2f"|format(stop.cost) }}</b></td></tr>
             <tr><td colspan="2"><hr style="margin:4px 0;border-color:#eee"></td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Dist. anterior</td>
-                <td style="padding:2px 0">{dist_prev:.0f} mi</td></tr>
+                <td style="padding:2px 0">{{ "%.0f"|format(dist_prev) }} mi</td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Dist. próximo</td>
-                <td style="padding:2px 0">{dist_next:.0f} mi</td></tr>
+                <td style="padding:2px 0">{{ "%.0f"|format(dist_next) }} mi</td></tr>
             <tr><td style="padding:2px 8px 2px 0;color:#666">Milha na rota</td>
-                <td style="padding:2px 0">~{s.get('mileage', 0):.0f} mi</td></tr>
+                <td style="padding:2px 0">~{{ "%.0f"|format(stop.get("mileage", 0)) }} mi</td></tr>
         </table>
     </div>
+"""
+
+# Todas as linhas do resumo num único render
+SUMMARY_ROWS_SRC = """
+{%- for stop, wp in rows %}
+    <tr>
+        <td style="padding:3px 6px">{{ loop.index }}</td>
+        <td style="padding:3px 6px">{{ stop.name[:25] }}</td>
+        <td style="padding:3px 6px;text-align:right">${{ "%.3f"|format(stop.price) }}</td>
+        <td style="padding:3px 6px;text-align:right">{{ "%.1f"|format(stop.gallons) }}</td>
+        <td style="padding:3px 6px;text-align:right">${{ "%.2f"|format(stop.cost) }}</td>
+        <td style="padding:3px 6px;text-align:right">{{ "%.0f"|format(wp.get("dist_from_prev", 0)) }}</td>
+    </tr>
+{%- endfor %}"""
+
+
+@cache
+def templates():
+    """``(popup, linhas do resumo)`` compilados no primeiro mapa; --check não paga jinja2."""
+    import jinja2
+
+    return (
+        jinja2.Template(POPUP_SRC, autoescape=True),
+        jinja2.Template(SUMMARY_ROWS_SRC, autoescape=True),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def color_by_price(price, mn, rng):
     """
+    Verde = barato, vermelho = caro (relativo aos stops escolhidos).
+    ``mn``/``rng`` vêm de ``price_scale`` (calculados uma vez, não por stop).
+    """
+    if rng is None:
+        return "#f97316"  # laranja
+    ratio = (price - mn) / rng
+    if ratio < 0.33:
+        return "#16a34a"  # verde
+    elif ratio < 0.66:
+        return "#f97316"  # laranja
+    return "#dc2626"  # vermelho
+
+
+def price_scale(prices):
+    """``(mínimo, amplitude)`` dos preços; amplitude ``None`` se todos iguais."""
+    if not prices:
+        return 0.0, None
+    mn = min(prices)
+    return mn, (max(prices) - mn) or None
+
+
+def render_map(data, start, end, out_path="route_map.html", gzip_output=False):
+    """
+    Gera o HTML do mapa para uma resposta de /api/route/.
+    Com ``gzip_output`` grava ``<out_path>.gz`` (uma escrita, bem menor).
+    """
+    # Imports pesados (folium/branca/jinja2, shapely) só quando há mapa a gerar
+    import folium
+
+    try:
+        from shapely.geometry import mapping, shape
+    except ImportError:  # shapely é opcional: sem ele a rota vai sem simplificar
+        shape = None
+
+    popup_tmpl, summary_rows_tmpl = templates()
+    stops = data["stops"]
+    total_miles = data["total_miles"]
+    total_cost = data["total_fuel_cost"]
+    total_gallons = data["total_gallons"]
+    mpg = data["mpg_used"]
+    # Rota degenerada (start == end) vem com 0 milhas
+    cost_per_mile = total_cost / total_miles if total_miles else 0.0
+
+    # Precomputar preços dos stops e a escala de cores
+    stop_prices = [s["price"] for s in stops]
+    price_min, price_range = price_scale(stop_prices)
+
+    # Pontos-chave: Start + Stops + End (usando mileage da rota, não haversine)
+    start_lat, start_lon = map(float, start.split(","))
+    end_lat, end_lon = map(float, end.split(","))
+
+    waypoints = [
+        {"label": "Start", "lat": start_lat, "lon": start_lon, "mileage": 0}
+    ]
+    for s in stops:
+        waypoints.append({
+            "label": s["name"],
+            "lat": s["lat"],
+            "lon": s["lon"],
+            "mileage": s.get("mileage") or 0,
+        })
+    waypoints.append({
+        "label": "End",
+        "lat": end_lat,
+        "lon": end_lon,
+        "mileage": total_miles,
+    })
+
+    # Distância entre waypoints consecutivos (pela rota, via mileage)
+    for prev, cur in pairwise(waypoints):
+        cur["dist_from_prev"] = cur["mileage"] - prev["mileage"]
+
+    # -----------------------------------------------------------------------
+    # Criar mapa
+    # -----------------------------------------------------------------------
+    route_geometry = data["route_geojson"]["geometry"]
+    # Remove vértices quase colineares: menos comandos SVG, mesmo desenho no zoom 6
+    if shape is not None and SIMPLIFY_TOLERANCE > 0:
+        route_geometry = mapping(
+            shape(route_geometry).simplify(SIMPLIFY_TOLERANCE, preserve_topology=False)
+        )
+    # Menos dígitos = HTML menor e JSON mais rápido de parsear no Leaflet
+    coords = [
+        [round(x, COORD_PRECISION), round(y, COORD_PRECISION)]
+        for x, y in route_geometry["coordinates"]
+    ]
+    data["route_geojson"]["geometry"] = {"type": "LineString", "coordinates": coords}
+    mid = coords[len(coords) // 2]
+    # Canvas: rota, trechos e stops desenhados num único <canvas>, não N nós SVG
+    m = folium.Map(
+        location=[mid[1], mid[0]],
+        zoom_start=6,
+        tiles="CartoDB positron",
+        prefer_canvas=True,
+    )
+    # Enquadra a rota inteira (zoom_start=6 corta rotas longas e afasta as curtas)
+    lons, lats = zip(*coords)
+    m.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]])
+
+    # Rota
+    folium.GeoJson(
+        data["route_geojson"],
+        style_function=lambda x: {"color": "#2563eb", "weight": 5, "opacity": 0.8},
+        name="Rota",
+    ).add_to(m)
+
+    # -----------------------------------------------------------------------
+    # Marcador Start
+    # -----------------------------------------------------------------------
     folium.Marker(
-        location=[s["lat"], s["lon"]],
-        icon=folium.Icon(color=icon_color, icon="gas-pump", prefix="fa"),
-        popup=folium.Popup(popup_html, max_width=320),
-        tooltip=f"#{stop_num} {s['name']} — ${s['price']:.3f}/gal",
+        [start_lat, start_lon],
+        icon=folium.Icon(color="green", icon="play", prefix="fa"),
+        popup=folium.Popup(f"""
+            <div style="font-family:system-ui;min-width:180px">
+                <h4 style="margin:0 0 6px;color:#16a34a">🟢 Partida</h4>
+                <b>Coordenadas:</b> {start_lat:.4f}, {start_lon:.4f}<br>
+                <b>Rota total:</b> {total_miles:.0f} mi
+            </div>
+        """, max_width=300),
     ).add_to(m)
 
-    # Linha tracejada do stop anterior ao stop atual
-    if i == 0:
-        prev_lat, prev_lon = start_lat, start_lon
-    else:
-        prev_lat, prev_lon = stops[i - 1]["lat"], stops[i - 1]["lon"]
+    # -----------------------------------------------------------------------
+    # Marcadores dos Stops com detalhes
+    # -----------------------------------------------------------------------
+    # Trecho anterior de cada stop; o próximo é o anterior do waypoint seguinte
+    leg_dists = [w["dist_from_prev"] for w in waypoints[1:]]
+    for stop_num, (s, dist_prev, dist_next) in enumerate(
+        zip(stops, leg_dists, leg_dists[1:]), start=1
+    ):
+        icon_color = color_by_price(s["price"], price_min, price_range)
 
-    folium.PolyLine(
-        [[prev_lat, prev_lon], [s["lat"], s["lon"]]],
-        color="#f97316", weight=2, dash_array="8",
-        opacity=0.6,
-        tooltip=f"{dist_prev:.0f} mi",
-    ).add_to(m)
+        popup_html = popup_tmpl.render(
+            stop=s, idx=stop_num, n=len(stops), dist_prev=dist_prev, dist_next=dist_next
+        )
+        # Círculo SVG: um nó por stop, sem ícone FontAwesome
+        folium.CircleMarker(
+            location=[s["lat"], s["lon"]],
+            radius=8,
+            color="#111",
+            weight=1,
+            fill=True,
+            fill_color=icon_color,
+            fill_opacity=0.9,
+            popup=folium.Popup(popup_html, max_width=320),
+            tooltip=f"#{stop_num} {s['name']} — ${s['price']:.3f}/gal",
+        ).add_to(m)
 
-# Linha tracejada do último stop ao End
-if stops:
-    last = stops[-1]
-    folium.PolyLine(
-        [[last["lat"], last["lon"]], [end_lat, end_lon]],
-        color="#f97316", weight=2, dash_array="8",
-        opacity=0.6,
-        tooltip=f"{waypoints[-1].get('dist_from_prev', 0):.0f} mi",
+    # Linhas tracejadas Start → stops → End: uma camada GeoJSON, não N PolyLines
+    if stops:
+        legs = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[a["lon"], a["lat"]], [b["lon"], b["lat"]]],
+                    },
+                    "properties": {"dist": f"{b['dist_from_prev']:.0f} mi"},
+                }
+                for a, b in pairwise(waypoints)
+            ],
+        }
+        folium.GeoJson(
+            legs,
+            style_function=lambda x: {
+                "color": "#f97316", "weight": 2, "dashArray": "8", "opacity": 0.6,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["dist"], labels=False),
+            name="Trechos",
+        ).add_to(m)
+
+    # -----------------------------------------------------------------------
+    # Marcador End
+    # -----------------------------------------------------------------------
+    folium.Marker(
+        [end_lat, end_lon],
+        icon=folium.Icon(color="black", icon="flag-checkered", prefix="fa"),
+        popup=folium.Popup(f"""
+            <div style="font-family:system-ui;min-width:180px">
+                <h4 style="margin:0 0 6px">🏁 Destino</h4>
+                <b>Coordenadas:</b> {end_lat:.4f}, {end_lon:.4f}
+            </div>
+        """, max_width=300),
     ).add_to(m)
 
-# ---------------------------------------------------------------------------
-# Marcador End
-# ---------------------------------------------------------------------------
-folium.Marker(
-    [end_lat, end_lon],
-    icon=folium.Icon(color="black", icon="flag-checkered", prefix="fa"),
-    popup=folium.Popup(f"""
-        <div style="font-family:system-ui;min-width:180px">
-            <h4 style="margin:0 0 6px">🏁 Destino</h4>
-            <b>Coordenadas:</b> {end_lat:.4f}, {end_lon:.4f}
-        </div>
-    """, max_width=300),
-).add_to(m)
+    # -----------------------------------------------------------------------
+    # Painel de resumo (canto superior direito)
+    # -----------------------------------------------------------------------
+    stops_summary_rows = summary_rows_tmpl.render(rows=zip(stops, waypoints[1:]))
 
-# ---------------------------------------------------------------------------
-# Painel de resumo (canto superior direito)
-# ---------------------------------------------------------------------------
-stops_summary_rows = ""
-for i, s in enumerate(stops):
-    wp = waypoints[i + 1]
-    stops_summary_rows += f"""
-    <tr>
-        <td style="padding:3px 6px">{i+1}</td>
-        <td style="padding:3px 6px">{s['name'][:25]}</td>
-        <td style="padding:3px 6px;text-align:right">${s['price']:.3f}</td>
-        <td style="padding:3px 6px;text-align:right">{s['gallons']:.1f}</td>
-        <td style="padding:3px 6px;text-align:right">${s['cost']:.2f}</td>
-        <td style="padding:3px 6px;text-align:right">{wp.get('dist_from_prev',0):.0f}</td>
-    </tr>"""
-
-summary_html = f"""
-<div style="
-    position:fixed;top:10px;right:10px;z-index:9999;
-    background:white;padding:14px 18px;border-radius:8px;
-    box-shadow:0 2px 12px rgba(0,0,0,0.15);font-family:system-ui;font-size:12px;
-    max-height:90vh;overflow-y:auto;min-width:420px;
-">
-    <h3 style="margin:0 0 10px;font-size:15px">📍 Resumo da Rota</h3>
-    <table style="margin-bottom:10px;font-size:12px">
-        <tr><td style="color:#666;padding-right:12px">Distância total</td>
-            <td><b>{total_miles:.0f} milhas</b></td></tr>
-        <tr><td style="color:#666;padding-right:12px">Paradas</td>
-            <td><b>{len(stops)}</b></td></tr>
-        <tr><td style="color:#666;padding-right:12px">Galões totais</td>
-            <td><b>{total_gallons:.1f} gal</b></td></tr>
-        <tr><td style="color:#666;padding-right:12px">Custo total</td>
-            <td><b style="color:#dc2626">${total_cost:.2f}</b></td></tr>
-        <tr><td style="color:#666;padding-right:12px">Consumo</td>
-            <td>{mpg} MPG</td></tr>
-        <tr><td style="color:#666;padding-right:12px">Custo/milha</td>
-            <td>${total_cost/total_miles:.3f}</td></tr>
-    </table>
-
-    <table style="width:100%;border-collapse:collapse;font-size:11px">
-        <thead>
-            <tr style="background:#f1f5f9;font-weight:600">
-                <th style="padding:4px 6px;text-align:left">#</th>
-                <th style="padding:4px 6px;text-align:left">Posto</th>
-                <th style="padding:4px 6px;text-align:right">$/gal</th>
-                <th style="padding:4px 6px;text-align:right">Gal</th>
-                <th style="padding:4px 6px;text-align:right">Custo</th>
-                <th style="padding:4px 6px;text-align:right">Dist</th>
-            </tr>
-        </thead>
-        <tbody>{stops_summary_rows}</tbody>
-    </table>
-    <div style="margin-top:8px;color:#999;font-size:10px">
-        🟢 barato &nbsp; 🟠 médio &nbsp; 🔴 caro (relativo)
+    summary_html = f"""
+    <div style="
+        position:fixed;top:10px;right:10px;z-index:9999;
+        background:white;padding:14px 18px;border-radius:8px;
+        box-shadow:0 2px 12px rgba(0,0,0,0.15);font-family:system-ui;font-size:12px;
+        max-height:90vh;overflow-y:auto;min-width:420px;
+    ">
+        <h3 style="margin:0 0 10px;font-size:15px">📍 Resumo da Rota</h3>
+        <table style="margin-bottom:10px;font-size:12px">
+            <tr><td style="color:#666;padding-right:12px">Distância total</td>
+                <td><b>{total_miles:.0f} milhas</b></td></tr>
+            <tr><td style="color:#666;padding-right:12px">Paradas</td>
+                <td><b>{len(stops)}</b></td></tr>
+            <tr><td style="color:#666;padding-right:12px">Galões totais</td>
+                <td><b>{total_gallons:.1f} gal</b></td></tr>
+            <tr><td style="color:#666;padding-right:12px">Custo total</td>
+                <td><b style="color:#dc2626">${total_cost:.2f}</b></td></tr>
+            <tr><td style="color:#666;padding-right:12px">Consumo</td>
+                <td>{mpg} MPG</td></tr>
+            <tr><td style="color:#666;padding-right:12px">Custo/milha</td>
+                <td>${cost_per_mile:.3f}</td></tr>
+        </table>
+
+        <table style="width:100%;border-collapse:collapse;font-size:11px">
+            <thead>
+                <tr style="background:#f1f5f9;font-weight:600">
+                    <th style="padding:4px 6px;text-align:left">#</th>
+                    <th style="padding:4px 6px;text-align:left">Posto</th>
+                    <th style="padding:4px 6px;text-align:right">$/gal</th>
+                    <th style="padding:4px 6px;text-align:right">Gal</th>
+                    <th style="padding:4px 6px;text-align:right">Custo</th>
+                    <th style="padding:4px 6px;text-align:right">Dist</th>
+                </tr>
+            </thead>
+            <tbody>{stops_summary_rows}</tbody>
+        </table>
+        <div style="margin-top:8px;color:#999;font-size:10px">
+            🟢 barato &nbsp; 🟠 médio &nbsp; 🔴 caro (relativo)
+        </div>
     </div>
-</div>
-"""
+    """
+
+    m.get_root().html.add_child(folium.Element(summary_html))
 
-m.get_root().html.add_child(folium.Element(summary_html))
+    # Layer control
+    folium.LayerControl().add_to(m)
+
+    # -----------------------------------------------------------------------
+    # Salvar
+    # -----------------------------------------------------------------------
+    if gzip_output:
+        out_path += ".gz"
+        with gzip.open(out_path, "wb", compresslevel=6) as f:
+            f.write(m.get_root().render().encode("utf-8"))
+    else:
+        m.save(out_path)
+    print(f"\n✅ Mapa salvo em {out_path}")
+    print(f"   Rota: {start} → {end}")
+    print(f"   Distância: {total_miles:.0f} mi | Paradas: {len(stops)} | Custo: ${total_cost:.2f}")
+    if gzip_output:
+        print("   Sirva com Content-Encoding: gzip (ou gunzip) para abrir no browser")
+    else:
+        print(f"   Abra no browser para visualizar!")
 
-# Layer control
-folium.LayerControl().add_to(m)
 
 # ---------------------------------------------------------------------------
-# Salvar
+# CLI
 # ---------------------------------------------------------------------------
-m.save("route_map.html")
-print(f"\n✅ Mapa salvo em route_map.html")
-print(f"   Rota: {start} → {end}")
-print(f"   Distância: {total_miles:.0f} mi | Paradas: {len(stops)} | Custo: ${total_cost:.2f}")
-print(f"   Abra no browser para visualizar!")
+def read_route_pairs(path):
+    """Pares ``start end`` de um arquivo (um por linha; ``#`` comenta)."""
+    pairs = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            pair_start, pair_end = line.split()
+            pairs.append((pair_start, pair_end))
+    return pairs
+
+
+parser = argparse.ArgumentParser(description="Mapa da rota com paradas de combustível.")
+parser.add_argument("start", nargs="?", default=DEFAULT_START, help="lat,lon de partida")
+parser.add_argument("end", nargs="?", default=DEFAULT_END, help="lat,lon de destino")
+parser.add_argument("--routes", metavar="ARQUIVO", help='um par "start end" por linha')
+parser.add_argument("--no-cache", action="store_true", help="ignora o cache em disco")
+parser.add_argument("--gzip", action="store_true", help="grava .html.gz")
+parser.add_argument("--check", action="store_true", help="só consulta a API, sem mapa")
+args = parser.parse_args()
+
+if args.routes:
+    # Várias rotas na mesma sessão HTTP: um HTML por par
+    route_pairs = read_route_pairs(args.routes)
+    out_paths = [f"route_map_{n}.html" for n in range(1, len(route_pairs) + 1)]
+else:
+    route_pairs = [(args.start, args.end)]
+    out_paths = ["route_map.html"]
+
+for (start, end), out_path in zip(route_pairs, out_paths):
+    try:
+        data = fetch_route(start, end, use_cache=not args.no_cache)
+    except RuntimeError as exc:
+        print(exc)
+        sys.exit(1)
+    if args.check:
+        print(
+            f"   {data['total_miles']:.0f} mi | Paradas: {len(data['stops'])}"
+            f" | Custo: ${data['total_fuel_cost']:.2f}"
+        )
+        continue
+    render_map(data, start, end, out_path, gzip_output=args.gzip)